@@ -3,7 +3,7 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from functions import top10_generos
+from functions import genre_counts
 from datetime import timedelta
 import folium
 from folium.plugins import HeatMap
@@ -11,10 +11,8 @@ from streamlit_folium import st_folium
 
 @st.cache_data
 def top10_genres_by_city(df):   
-    df_genero = df[~df['event_genres'].isnull()] 
-    # is not 'NaN
-    df_genero = df_genero[df_genero['event_genres'] != 'NaN']
-    genero = top10_generos(df_genero)
+    # Top 10 genres per city (events without genres are skipped)
+    genero = genre_counts(df, 'city')
 
     # Visualization 1: Top 10 Genres by City
 
@@ -39,9 +37,7 @@ def top10_genres_by_city(df):
 @st.cache_data   
 def genres_by_city_sunburst(df):
     
-    df_genero = df[~df['event_genres'].isnull()]
-    df_genero = df_genero[df_genero['event_genres'] != 'NaN']
-    genero = top10_generos(df_genero)
+    genero = genre_counts(df, 'city')
     
     fig_sunburst = px.sunburst(
     genero,
@@ -62,15 +58,10 @@ def genres_by_city_sunburst(df):
 def average_ticket_prices_by_city_and_day_of_the_week(df):
 
     # Filter out rows where ticket prices are not available
-    df_precios = df[df['ticket_price'] != 'No information available'].copy()
+    df_precios = df[~df['ticket_price_no_info']].copy()
 
-    # Convert ticket prices to floats and calculate mean
-    # Split the prices, convert to float, and compute the mean in one step
-    df_precios['mean_price'] = (
-        df_precios['ticket_price']
-        .str.split(', ')
-        .apply(lambda prices: np.mean(list(map(float, prices))))
-    )
+    # Mean ticket price, precomputed at ETL time (see preprocess_data)
+    df_precios['mean_price'] = df_precios['ticket_price_mean']
 
     # Create the box plot with Plotly
     fig_box = px.box(
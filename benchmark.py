@@ -0,0 +1,537 @@
+# Benchmarks for the scraper and analytics helpers, run offline on the recorded pages in
+# Data/fixtures (served from a local HTTP server where a fetch path is exercised).
+# Every run is appended to Data/benchmarks.csv and compared with the previous run.
+# Usage: python benchmark.py [benchmark ...]   (default: run them all)
+
+import contextlib
+from collections import Counter
+import glob
+import io
+import os
+import re
+import sys
+import time
+import threading
+import resource
+import subprocess
+import tempfile
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+import pandas as pd
+from bs4 import BeautifulSoup
+import functions
+from fake_airtable import FakeAirtable
+from functions import parse_event_page, start_finish_times, parse_xceed_dates, clean_sorted_prices, clean_prices, genre_counts, top10_generos, GenreIndex
+
+FIXTURES_DIR = 'Data/fixtures'
+RESULTS_PATH = 'Data/benchmarks.csv'
+
+def load_event_fixtures():
+    paths = sorted(glob.glob(os.path.join(FIXTURES_DIR, 'events', '*.html')))
+    return [open(path, encoding='utf-8').read() for path in paths]
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    # Serves the recorded corpus under Xceed's URL layout: /en/<city>/events/all/all-events
+    # is the recorded listing and /en/<city>/event/<slug> the recorded detail page
+    # (query strings are ignored, so one page can stand in for many URLs)
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        parts = path.strip('/').split('/')
+        if path.endswith('/all-events'):
+            file_path = os.path.join(FIXTURES_DIR, 'listings', f'{parts[1]}.html')
+        elif len(parts) == 4 and parts[2] == 'event':
+            file_path = os.path.join(FIXTURES_DIR, 'events', f'{parts[3]}.html')
+        else:
+            file_path = None
+
+        if file_path is None or not os.path.exists(file_path):
+            self.send_error(404)
+            return
+        body = open(file_path, 'rb').read()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def _http_complete(html):
+    record = functions.parse_event_page(html)
+    return not any(pd.isna(record[field]) or record[field] == '' for field in functions.REQUIRED_EVENT_FIELDS)
+
+class FixtureServer:
+    # Local HTTP server for the recorded corpus; the scrapers are pointed at it
+    # and its host is exempt from the production rate limits
+    def __enter__(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+        self._base_url = functions.XCEED_BASE_URL
+        functions.XCEED_BASE_URL = self.base_url
+        functions.HOST_RATE_LIMITS['127.0.0.1'] = {'rate': 10000.0, 'max_rate': 10000.0}
+        return self
+
+    def event_urls(self, n, http_only=False):
+        # With http_only, only the pages the HTTP backend can finish without a browser fallback
+        paths = sorted(glob.glob(os.path.join(FIXTURES_DIR, 'events', '*.html')))
+        if http_only:
+            paths = [path for path in paths if _http_complete(open(path, encoding='utf-8').read())]
+        slugs = [os.path.basename(path)[:-5] for path in paths]
+        return [f'{self.base_url}/en/valencia/event/{slugs[i % len(slugs)]}?copy={i}' for i in range(n)]
+
+    def __exit__(self, exc_type, exc, tb):
+        functions.XCEED_BASE_URL = self._base_url
+        self.server.shutdown()
+
+def browser_processes():
+    # Number of running Chrome/chromedriver processes and their total resident memory in MB
+    count, rss_kb = 0, 0
+    for proc in glob.glob('/proc/[0-9]*'):
+        try:
+            if 'chrom' not in open(f'{proc}/comm').read().lower():
+                continue
+            status = open(f'{proc}/status').read()
+        except OSError:
+            continue
+        count += 1
+        match = re.search(r'VmRSS:\s+(\d+)', status)
+        rss_kb += int(match.group(1)) if match else 0
+    return count, round(rss_kb / 1024, 1)
+
+class ResourceMonitor:
+    # Samples the browser processes in the background while a benchmark runs
+    def __enter__(self):
+        self.peak_browsers, self.peak_browser_rss = browser_processes()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(0.2):
+            count, rss = browser_processes()
+            self.peak_browsers = max(self.peak_browsers, count)
+            self.peak_browser_rss = max(self.peak_browser_rss, rss)
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self.leftover_browsers, _ = browser_processes()
+
+def peak_rss_mb():
+    # Peak resident memory of this process, in MB
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+def chrome_available():
+    try:
+        with functions.BrowserPool() as pool:
+            pool._start()
+        return True
+    except Exception:
+        return False
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ''
+
+def record_result(benchmark, **metrics):
+    # Append one row per metric and flag metrics that moved >10% the wrong way since the last run
+    previous = pd.read_csv(RESULTS_PATH) if os.path.exists(RESULTS_PATH) else None
+    rows = pd.DataFrame({'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'revision': git_revision(),
+                         'benchmark': benchmark, 'metric': list(metrics), 'value': list(metrics.values())})
+    rows.to_csv(RESULTS_PATH, mode='a', header=previous is None, index=False)
+
+    for metric, value in metrics.items():
+        line = f"  {metric}: {value}"
+        if previous is not None:
+            last = previous[(previous['benchmark'] == benchmark) & (previous['metric'] == metric)]
+            if not last.empty and last['value'].iloc[-1]:
+                change = (value - last['value'].iloc[-1]) / last['value'].iloc[-1]
+                worse = change < -0.1 if metric.endswith('per_sec') else change > 0.1
+                line += f"  ({change:+.0%} vs {last['revision'].iloc[-1]}{', REGRESSION' if worse else ''})"
+        print(line)
+
+def best_time(fn, *args, repeat=5, number=1):
+    # Best-of-`repeat` wall time of `number` calls, in seconds per call
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn(*args)
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+# Event page parser as it was before the compiled lxml extractor, kept as the baseline
+def legacy_parse_event_page(html):
+
+    soup2 = BeautifulSoup(html, "html.parser")
+
+    #event_name
+    try:
+        ev_name = soup2.find('h1').text
+    except:
+        ev_name = np.nan
+    # genre     
+    try:
+        event_genre = ', '.join([x.text for x in soup2.find_all('span', attrs={'name': True})])
+
+    except:
+        event_genre = np.nan
+
+    # line up
+    try:       
+        event_lineup = ', '.join([x.text for x in soup2.find('div', class_ = 'LineUp-sc-1xigslr-0').find_all('h3')])
+
+    except:
+        event_lineup = np.nan
+
+    # Venue information
+    try:
+        v_info = soup2.find_all('div', attrs={'overflow':'hidden'})[0].text
+        venue_info = re.sub(r'\s+', ' ', v_info).strip()
+
+    except:
+        venue_info = np.nan
+        
+    # Venue local information
+    try:
+        v_local_info = soup2.find_all('div', attrs={'overflow':'hidden'})[1].text
+        venue_local_info = re.sub(r'\s+', ' ', v_local_info).strip()
+
+    except:
+        venue_local_info = np.nan
+
+    # ticket_type
+    try:
+        unique_ticket_types = {x.text for x in soup2.find_all('h3', class_ = 'Name-sc-17wxn8u-0')}
+        ticket_types = ', '.join(unique_ticket_types)
+
+    except:
+        ticket_types = np.nan
+    # Ticket price
+    # Utilizamos {} para quitar los valores duplicados.       
+    try:
+        unique_ticket_prices = {x.text.strip() for x in soup2.find_all('p', class_='PriceText-sc-17wxn8u-2')}
+        ticket_prices = ', '.join(unique_ticket_prices)
+
+    except:
+        ticket_prices = np.nan
+    # ubicacion
+    try:
+        location_id = soup2.find('a', class_ ='TertiaryTitle-sc-hrr11b-4')['href'].split('=')[-1]
+
+    except:
+        location_id = np.nan
+    # direccion
+    try:
+        location = soup2.find('p', attrs={'color':'#6E7A83'}).text
+
+    except:
+        location = np.nan
+
+    # Entradas que quedan
+    # Utilizamos {} para quitar los valores duplicados.
+    try:
+        remaining_prices_set = {x.text.strip() for x in soup2.find_all('p', class_ = 'PriceText-sc-17wxn8u-2') if "inherit" in str(x)}
+        remaining_ticket_prices = ', '.join(remaining_prices_set)
+    #if "inherit" in str(x): # con 'inherit' nos va a enseñar las entradas que quedan, si lo cambio por 'inherit' nos va a ensañar solo las entradas agotadas si hay
+
+    except:
+        remaining_ticket_prices = np.nan
+
+    return {'event_title': ev_name,
+            'event_genres': event_genre,
+            'line_up': event_lineup,
+            'venue_information': venue_info,
+            'event_location_details': venue_local_info,
+            'event_ticket_types': ticket_types,
+            'ticket_price': ticket_prices,
+            'location_identifier': location_id,
+            'location_address': location,
+            'remain_prices': remaining_ticket_prices}
+
+# Genre counter as it was before genre_counts, kept as the baseline
+def legacy_top10_generos(df):
+    # Initialize an empty list to store results
+    result = []
+
+    # Iterate over each city in the DataFrame
+    for city in df['city'].unique():
+        # Get the list of genres for the current city
+        city_genres = df[df['city'] == city]['event_genres']
+        
+        # Split genres for each event in the city
+        lista_generos = [x.split(', ') for x in city_genres]
+        
+        # Flatten the list of lists into a single list for the city
+        nueva_lista = []
+        for l in lista_generos:
+            nueva_lista.extend(l)
+
+        # Count the occurrences of each genre in the city
+        conteo = Counter(nueva_lista)
+        
+        # Convert the count into a DataFrame for the current city
+        df_gener = pd.DataFrame({'genero': list(conteo.keys()), 'frecuencia': list(conteo.values())})
+        
+        # Sort by frequency and get the top 10 genres
+        df_gener = df_gener.sort_values('frecuencia', ascending=False, ignore_index=True).head(10)
+        
+        # Add the city column to the result
+        df_gener['city'] = city
+        
+        # Append the city result to the main list
+        result.append(df_gener)
+        
+        # if there is only one city, return the DataFrame
+        if len(df['city'].unique()) == 1:
+            return df_gener
+        
+        else:
+            continue
+    # Concatenate all results into one DataFrame
+    df_result = pd.concat(result, ignore_index=True)
+    
+    return df_result
+
+def _same_field(a, b):
+    # Joined fields built from sets have no stable order, so compare them as sets
+    if isinstance(a, str) and isinstance(b, str):
+        return set(a.split(', ')) == set(b.split(', '))
+    return (pd.isna(a) and pd.isna(b)) or a == b
+
+def bench_parsers(number=50):
+    pages = load_event_fixtures()
+
+    for html in pages:
+        legacy, compiled = legacy_parse_event_page(html), parse_event_page(html)
+        mismatched = [field for field in legacy if not _same_field(legacy[field], compiled[field])]
+        if mismatched:
+            print(f"Parser mismatch on fields: {mismatched}")
+
+    legacy_ms = np.mean([best_time(legacy_parse_event_page, html, number=number) for html in pages]) * 1000
+    compiled_ms = np.mean([best_time(parse_event_page, html, number=number) for html in pages]) * 1000
+
+    print(f"Event page parsing on {len(pages)} saved pages")
+    print(f"  BeautifulSoup (html.parser): {legacy_ms:.3f} ms/page")
+    print(f"  Compiled lxml extractor:     {compiled_ms:.3f} ms/page ({legacy_ms / compiled_ms:.1f}x)")
+    record_result('parsers', legacy_parse_ms_per_page=round(legacy_ms, 3), parse_ms_per_page=round(compiled_ms, 3))
+
+def bench_listing():
+    if not chrome_available():
+        print("Listing crawl: skipped, Chrome is not available")
+        return
+    with FixtureServer(), ResourceMonitor() as monitor:
+        start = time.perf_counter()
+        # The recorded listing runs from 18 to 23 Nov 2024: crawl exactly that window, so
+        # the run ends on the cutoff date instead of on idle-scroll timeouts
+        df = functions.scraping_xceed_urls(['Valencia'], datetime(2024, 11, 23), start_date=datetime(2024, 11, 18))
+        seconds = time.perf_counter() - start
+    print(f"Listing crawl of the recorded Valencia listing ({len(df)} events)")
+    record_result('listing', seconds=round(seconds, 3), events=len(df), peak_rss_mb=peak_rss_mb(),
+                  peak_browser_rss_mb=monitor.peak_browser_rss, peak_browser_processes=monitor.peak_browsers,
+                  leftover_browser_processes=monitor.leftover_browsers)
+
+def _bench_detail(name, backend, n, workers, http_only=False):
+    with FixtureServer() as server, ResourceMonitor() as monitor:
+        df = pd.DataFrame({'place': 'La3', 'url': server.event_urls(n, http_only), 'image': np.nan,
+                           'date': 'Mon, 18 Nov 2024 | 23:59 - 07:00'})
+        start = time.perf_counter()
+        functions.update_xceed_data(df, workers=workers, backend=backend)
+        seconds = time.perf_counter() - start
+    print(f"Detail crawl of {n} recorded pages ({backend} backend, {workers} workers)")
+    record_result(name, pages_per_sec=round(n / seconds, 1), peak_rss_mb=peak_rss_mb(), peak_browser_rss_mb=monitor.peak_browser_rss,
+                  peak_browser_processes=monitor.peak_browsers, leftover_browser_processes=monitor.leftover_browsers)
+
+def bench_detail_http(n=300):
+    # Pages without server-rendered tickets fall back to Chrome; without it, leave them out
+    http_only = not chrome_available()
+    if http_only:
+        print("Detail crawl (http backend): Chrome is not available, pages needing the browser fallback are left out")
+    _bench_detail('detail_http_1_worker', 'http', n, workers=1, http_only=http_only)
+    _bench_detail('detail_http_4_workers', 'http', n, workers=4, http_only=http_only)
+
+def bench_detail_browser(n=50):
+    if not chrome_available():
+        print("Detail crawl (browser backend): skipped, Chrome is not available")
+        return
+    _bench_detail('detail_browser_4_workers', 'browser', n, workers=4)
+
+def bench_dates(n=20000):
+    # A year of event dates across a handful of typical time slots
+    days = pd.date_range('2024-01-01', periods=365).strftime('%a, %d %b %Y')
+    slots = ['23:59 - 07:00', '21:00 - 01:30', '12:00 - 20:00', '00:00 - 06:00', '18:00 - 23:00']
+    rng = np.random.default_rng(0)
+    dates = pd.Series([f'{rng.choice(days)} | {rng.choice(slots)}' for _ in range(n)])
+
+    def row_wise():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return dates.apply(lambda x: start_finish_times(x)[0]), dates.apply(lambda x: start_finish_times(x)[1])
+
+    legacy_start, legacy_finish = row_wise()
+    starting_time, finishing_time = parse_xceed_dates(dates)
+    if not (legacy_start.equals(starting_time) and legacy_finish.equals(finishing_time)):
+        print("Date parser mismatch")
+
+    legacy_ms = best_time(row_wise, repeat=3) * 1000
+    vectorized_ms = best_time(parse_xceed_dates, dates, repeat=3) * 1000
+    print(f"Date parsing of {len(dates)} rows")
+    print(f"  start_finish_times via apply: {legacy_ms:.1f} ms")
+    print(f"  parse_xceed_dates:            {vectorized_ms:.1f} ms ({legacy_ms / vectorized_ms:.1f}x)")
+    record_result('dates', legacy_ms=round(legacy_ms, 1), vectorized_ms=round(vectorized_ms, 1))
+
+def _scraped_price_text(prices):
+    # Cleaned price list ("0.0, 12.0, 1200.0") back to the text on the event page
+    return ', '.join('Free' if float(p) == 0 else f'€{float(p):,.2f}'.replace('.00', '')
+                     for p in prices.split(', '))
+
+def bench_prices(n=100000):
+    # Resample the price lists recorded in the preprocessed data up to n rows, plus a
+    # worst case where most rows are distinct (random tier combinations)
+    df = pd.read_csv('Data/airtable_preprocessed_data.csv')
+    recorded = pd.concat([df['ticket_price'], df['remain_prices']])
+    recorded = recorded[~recorded.isin([functions.SOLD_OUT, functions.NO_PRICE_INFO])].map(_scraped_price_text)
+    rng = np.random.default_rng(0)
+    tiers = ['Free', '€5', '€10', '€12.50', '€15', '€18', '€20', '€25', '€30', '€45', '€1,200']
+    workloads = {
+        'recorded': recorded.sample(n, replace=True, random_state=0).reset_index(drop=True),
+        'distinct': pd.Series([', '.join(rng.choice(tiers, size=rng.integers(1, 7), replace=False)) for _ in range(n)]),
+    }
+
+    for name, raw in workloads.items():
+        def per_cell():
+            return raw.apply(lambda x: clean_sorted_prices(x))
+
+        if not per_cell().equals(clean_prices(raw)):
+            print("Price cleaning mismatch")
+
+        legacy_ms = best_time(per_cell) * 1000
+        vectorized_ms = best_time(clean_prices, raw) * 1000
+        print(f"Price cleaning of {len(raw)} rows ({name}, {raw.nunique()} distinct)")
+        print(f"  clean_sorted_prices via apply: {legacy_ms:.1f} ms")
+        print(f"  clean_prices:                  {vectorized_ms:.1f} ms ({legacy_ms / vectorized_ms:.1f}x)")
+        record_result(f'prices_{name}', legacy_ms=round(legacy_ms, 1), vectorized_ms=round(vectorized_ms, 1))
+
+def bench_genres(n=100000):
+    # The preprocessed events resampled up to n rows
+    df = pd.read_csv('Data/airtable_preprocessed_data.csv')
+    df = df[df['event_genres'].notna()].sample(n, replace=True, random_state=0).reset_index(drop=True)
+
+    # Ties may come out in a different order (the old sort was not stable), so compare
+    # the frequency at each rank
+    def ranked(genres):
+        return genres.assign(rank=genres.groupby('city').cumcount()).set_index(['city', 'rank'])['frecuencia'].sort_index()
+
+    if not ranked(legacy_top10_generos(df)).equals(ranked(top10_generos(df))):
+        print("Genre counts mismatch")
+
+    legacy_ms = best_time(legacy_top10_generos, df, repeat=3) * 1000
+    vectorized_ms = best_time(top10_generos, df, repeat=3) * 1000
+    grouped_ms = best_time(genre_counts, df, ['city', 'district', 'starting_day'], repeat=3) * 1000
+    print(f"Top genres per city over {len(df)} events")
+    print(f"  top10_generos (per-city loop): {legacy_ms:.1f} ms")
+    print(f"  genre_counts:                  {vectorized_ms:.1f} ms ({legacy_ms / vectorized_ms:.1f}x)")
+    print(f"  genre_counts by city, district and day: {grouped_ms:.1f} ms")
+    record_result('genres', legacy_ms=round(legacy_ms, 1), vectorized_ms=round(vectorized_ms, 1),
+                  grouped_ms=round(grouped_ms, 1))
+
+def bench_genre_filter(n=100000, genres=('Techno', 'House', 'Hits')):
+    # "Events in Valencia, free, with any of these genres": the dashboard's filter
+    df = pd.read_csv('Data/airtable_preprocessed_data.csv')
+    df = df.sample(n, replace=True, random_state=0).reset_index(drop=True)
+    base = (df['city'] == 'Valencia').to_numpy() & df['free_entrance'].to_numpy()
+
+    pattern = r'(?:^|, )(?:%s)(?:,|$)' % '|'.join(map(re.escape, genres))
+
+    def rescan():
+        return base & df['event_genres'].str.contains(pattern, regex=True, na=False).to_numpy()
+
+    start = time.perf_counter()
+    index = GenreIndex(df['event_genres'])
+    build_ms = (time.perf_counter() - start) * 1000
+
+    def indexed():
+        return base & index.mask(list(genres))
+
+    if not np.array_equal(rescan(), indexed()):
+        print("Genre filter mismatch")
+
+    rescan_ms = best_time(rescan, repeat=5) * 1000
+    indexed_ms = best_time(indexed, repeat=5) * 1000
+    print(f"Genre filter over {len(df)} events ({len(index.genres)} genres)")
+    print(f"  str.contains rescan: {rescan_ms:.2f} ms")
+    print(f"  GenreIndex.mask:     {indexed_ms:.2f} ms ({rescan_ms / indexed_ms:.0f}x), index built in {build_ms:.1f} ms")
+    record_result('genre_filter', rescan_ms=round(rescan_ms, 2), indexed_ms=round(indexed_ms, 3),
+                  build_ms=round(build_ms, 1))
+
+def _airtable_rows(n, prefix):
+    # n Airtable-ready rows with unique urls, resampled from the preprocessed events
+    df = pd.read_csv('Data/airtable_preprocessed_data.csv', dtype=str, keep_default_na=False)
+    df = functions.airtable_columns_order(df.sample(n, replace=True, random_state=0).reset_index(drop=True))
+    return df.assign(url=[f'{XCEED_EVENT_URL}/{prefix}--{i}' for i in range(n)])
+
+XCEED_EVENT_URL = 'https://xceed.me/en/valencia/event/benchmark'
+
+def bench_airtable(n=1000, latency=0.05):
+    # Sync / upload / upsert throughput against the local Airtable stand-in, with its
+    # 5 req/s limit and `latency` seconds per request. A 429 or a failed row means the
+    # client outran the limit or lost data
+    functions.AIRTABLE_CLIENT.reset_stats()
+    with FakeAirtable(latency=latency) as airtable, tempfile.TemporaryDirectory() as tmp:
+        known, new = _airtable_rows(n, 'known'), _airtable_rows(n, 'new')
+        airtable.seed('base', 'events', known.to_dict('records'))
+        headers = {'Authorization': 'Bearer token'}
+        store = functions.EventStore(os.path.join(tmp, 'events.db'))
+
+        start = time.perf_counter()
+        store.sync_from_airtable(airtable.endpoint('base', 'events'), headers)
+        sync_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        report = functions.upload_to_airtable(new, 'token', 'base', 'events')
+        upload_s = time.perf_counter() - start
+        upload_failed = int((~report['ok']).sum())
+
+        # A typical update run: 10% of the known events changed price, plus new events
+        changed = known.sample(frac=0.1, random_state=1).assign(remain_prices='SOLD OUT')
+        batch = pd.concat([changed, _airtable_rows(n // 10, 'upsert')], ignore_index=True)
+        start = time.perf_counter()
+        report = functions.upsert_airtable_events(batch, 'token', 'base', 'events',
+                                                  current=store.to_dataframe(['url', 'remain_prices']))
+        upsert_s = time.perf_counter() - start
+        upsert_failed = int((report['action'] == 'failed').sum())
+        store.close()
+
+    requests_sent = sum(v for k, v in airtable.stats.items() if k in ('GET', 'POST', 'PATCH'))
+    print(f"Airtable stand-in, {n} records per step, {latency * 1000:.0f} ms latency")
+    print(f"  full sync:  {sync_s:.1f} s ({n / sync_s:.0f} records/s)")
+    print(f"  upload:     {upload_s:.1f} s ({n / upload_s:.0f} records/s, {upload_failed} failed)")
+    print(f"  upsert:     {upsert_s:.1f} s for {len(batch)} rows ({upsert_failed} failed)")
+    print(f"  {requests_sent} requests over {airtable.stats['connections']} connections, "
+          f"{airtable.stats[429]} rate limited, peak {airtable.peak_in_flight} in flight")
+    print(functions.AIRTABLE_CLIENT.latency_stats().to_string(index=False))
+    print(functions.AIRTABLE_CLIENT.latency_histogram().to_string())
+    record_result('airtable', sync_s=round(sync_s, 2), upload_s=round(upload_s, 2), upsert_s=round(upsert_s, 2),
+                  requests=requests_sent, connections=airtable.stats['connections'],
+                  rate_limited=airtable.stats[429], failed=upload_failed + upsert_failed)
+
+BENCHMARKS = {
+    'parsers': bench_parsers,
+    'listing': bench_listing,
+    'detail_http': bench_detail_http,
+    'detail_browser': bench_detail_browser,
+    'dates': bench_dates,
+    'prices': bench_prices,
+    'genres': bench_genres,
+    'genre_filter': bench_genre_filter,
+    'airtable': bench_airtable,
+}
+
+if __name__ == '__main__':
+    for name in sys.argv[1:] or list(BENCHMARKS):
+        BENCHMARKS[name]()
@@ -0,0 +1,267 @@
+# In-process stand-in for the Airtable REST API, for exercising the Airtable helpers in
+# functions.py without credentials or network and for load benchmarks. It implements
+# list (offset pagination, fields[], view, the IS_AFTER(LAST_MODIFIED_TIME(), ...) and
+# OR(RECORD_ID() = ...) formulas used by EventStore), create, update and upsert
+# (performUpsert), with Airtable's limits: 10 records per write request and 5
+# requests/sec per base, answered with 422 and 429 like the real API. Latency can be
+# injected per request.
+#
+#   with FakeAirtable(latency=0.05) as airtable:      # functions.py now talks to it
+#       airtable.seed('base', 'table', [{'url': ...}, ...])
+#       upload_to_airtable(df, 'token', 'base', 'table')
+
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import functions
+
+MAX_RECORDS_PER_REQUEST = 10
+PAGE_SIZE = 100
+
+def _now():
+    return datetime.now(timezone.utc)
+
+class FakeAirtableHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        # One handler per connection: counts how well clients reuse keep-alive connections
+        super().setup()
+        with self.server.airtable._lock:
+            self.server.airtable.stats['connections'] += 1
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        if status == 429:
+            self.send_header('Retry-After', str(self.server.airtable.retry_after))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status, error_type, message=''):
+        self._reply(status, {'error': {'type': error_type, 'message': message}})
+
+    def _handle(self, method):
+        airtable = self.server.airtable
+        url = urlparse(self.path)
+        parts = url.path.strip('/').split('/')
+        body = None
+        if method in ('POST', 'PATCH'):
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+
+        airtable.begin()
+        try:
+            if not self.headers.get('Authorization', '').startswith('Bearer '):
+                return self._error(401, 'AUTHENTICATION_REQUIRED')
+            if len(parts) != 3 or parts[0] != 'v0':
+                return self._error(404, 'NOT_FOUND')
+            base, table = parts[1], parts[2]
+            # Requests count against the limit when they arrive, then take `latency` to serve
+            allowed = airtable.allow(base)
+            airtable.sleep()
+            if not allowed:
+                return self._reply(429, {'errors': [{'error': 'RATE_LIMIT_REACHED',
+                                                     'message': 'Rate limit exceeded. Please try again later'}]})
+            if method == 'GET':
+                return self._reply(*airtable.list_records(base, table, parse_qs(url.query)))
+            records = body.get('records', [])
+            if len(records) > MAX_RECORDS_PER_REQUEST:
+                return self._error(422, 'INVALID_RECORDS', f'Request contains more than {MAX_RECORDS_PER_REQUEST} records')
+            if method == 'POST':
+                return self._reply(*airtable.create_records(base, table, records))
+            if 'performUpsert' in body:
+                return self._reply(*airtable.upsert_records(base, table, records,
+                                                            body['performUpsert'].get('fieldsToMergeOn', [])))
+            return self._reply(*airtable.update_records(base, table, records))
+        finally:
+            airtable.end(self)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PATCH(self):
+        self._handle('PATCH')
+
+class FakeAirtable:
+    # `rate` is the per-base request limit (Airtable: 5/s) and `penalty` how long a base
+    # keeps answering 429 after going over it (Airtable: 30 s). `latency` is seconds of
+    # delay per request, or a (low, high) range to draw from.
+    def __init__(self, rate=5, penalty=0.0, latency=0.0, retry_after=1):
+        self.rate = rate
+        self.penalty = penalty
+        self.latency = latency
+        self.retry_after = retry_after
+        self.tables = defaultdict(dict)
+        self.stats = defaultdict(int)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._ids = itertools.count(1)
+        self._sent = defaultdict(deque)
+        self._blocked_until = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeAirtableHandler)
+        self.server.daemon_threads = True
+        self.server.airtable = self
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        # 'localhost' rather than 127.0.0.1 so the client-side limiter keeps a separate
+        # bucket from the fixture server used by the scraper benchmarks
+        self.api_url = f'http://localhost:{self.server.server_port}/v0'
+        self._api_url = functions.AIRTABLE_API_URL
+        self._limits = functions.HOST_RATE_LIMITS.get('localhost')
+        functions.AIRTABLE_API_URL = self.api_url
+        # The client keeps the same headroom under the fake's limit as under Airtable's
+        limits = functions.HOST_RATE_LIMITS['api.airtable.com']
+        client_rate = self.rate * limits['max_rate'] / 5
+        functions.HOST_RATE_LIMITS['localhost'] = {**limits, 'rate': client_rate, 'max_rate': client_rate}
+        functions.RATE_LIMITER._buckets.pop('localhost', None)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        functions.AIRTABLE_API_URL = self._api_url
+        if self._limits is None:
+            functions.HOST_RATE_LIMITS.pop('localhost', None)
+        else:
+            functions.HOST_RATE_LIMITS['localhost'] = self._limits
+        functions.RATE_LIMITER._buckets.pop('localhost', None)
+        self.server.shutdown()
+        self.server.server_close()
+
+    def endpoint(self, base, table):
+        return f'{self.api_url}/{base}/{table}'
+
+    # Request accounting
+
+    def begin(self):
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def end(self, handler):
+        with self._lock:
+            self.in_flight -= 1
+            self.stats[handler.command] += 1
+
+    def sleep(self):
+        latency = random.uniform(*self.latency) if isinstance(self.latency, tuple) else self.latency
+        if latency:
+            time.sleep(latency)
+
+    def allow(self, base):
+        # Sliding one-second window per base, like Airtable's 5 requests/sec
+        with self._lock:
+            now = time.monotonic()
+            sent = self._sent[base]
+            while sent and sent[0] <= now - 1:
+                sent.popleft()
+            if now < self._blocked_until[base] or len(sent) >= self.rate:
+                self._blocked_until[base] = max(self._blocked_until[base], now + self.penalty)
+                self.stats[429] += 1
+                return False
+            sent.append(now)
+            return True
+
+    # Table operations (each returns status, body)
+
+    def seed(self, base, table, rows):
+        # Insert rows (field dicts) directly, without going through the API or its limits
+        with self._lock:
+            for fields in rows:
+                self._insert(base, table, fields)
+
+    def records(self, base, table):
+        return [{'id': record_id, 'fields': dict(record['fields'])}
+                for record_id, record in self.tables[(base, table)].items()]
+
+    def _insert(self, base, table, fields):
+        record_id = f'rec{next(self._ids):014d}'
+        now = _now()
+        self.tables[(base, table)][record_id] = {'fields': dict(fields), 'createdTime': now, 'modified': now}
+        return record_id
+
+    def _record(self, base, table, record_id, fields=None):
+        record = self.tables[(base, table)][record_id]
+        fields = record['fields'] if fields is None else {k: v for k, v in record['fields'].items() if k in fields}
+        return {'id': record_id, 'createdTime': record['createdTime'].strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+                'fields': fields}
+
+    def list_records(self, base, table, query):
+        formula = query.get('filterByFormula', [None])[0]
+        since = record_ids = None
+        if formula:
+            match = re.fullmatch(r"IS_AFTER\(LAST_MODIFIED_TIME\(\), '([^']+)'\)", formula)
+            by_id = re.fullmatch(r"OR\((RECORD_ID\(\) = '[^']+'(, )?)+\)", formula)
+            if match:
+                since = datetime.strptime(match.group(1), '%Y-%m-%dT%H:%M:%S.000Z').replace(tzinfo=timezone.utc)
+            elif by_id:
+                record_ids = set(re.findall(r"RECORD_ID\(\) = '([^']+)'", formula))
+            else:
+                return 422, {'error': {'type': 'INVALID_FILTER_BY_FORMULA', 'message': formula}}
+        page_size = min(int(query.get('pageSize', [PAGE_SIZE])[0]), PAGE_SIZE)
+        offset = int(query.get('offset', ['0'])[0])
+        fields = query.get('fields[]')
+
+        with self._lock:
+            ids = [record_id for record_id, record in self.tables[(base, table)].items()
+                   if (since is None or record['modified'] > since) and (record_ids is None or record_id in record_ids)]
+            page = [self._record(base, table, record_id, fields) for record_id in ids[offset:offset + page_size]]
+        body = {'records': page}
+        if offset + page_size < len(ids):
+            body['offset'] = str(offset + page_size)
+        return 200, body
+
+    def create_records(self, base, table, records):
+        with self._lock:
+            ids = [self._insert(base, table, record.get('fields', {})) for record in records]
+            return 200, {'records': [self._record(base, table, record_id) for record_id in ids]}
+
+    def update_records(self, base, table, records):
+        with self._lock:
+            missing = [record.get('id') for record in records if record.get('id') not in self.tables[(base, table)]]
+            if missing:
+                return 404, {'error': {'type': 'NOT_FOUND', 'message': f'Records not found: {missing}'}}
+            for record in records:
+                stored = self.tables[(base, table)][record['id']]
+                stored['fields'].update(record.get('fields', {}))
+                stored['modified'] = _now()
+            return 200, {'records': [self._record(base, table, record['id']) for record in records]}
+
+    def upsert_records(self, base, table, records, merge_on):
+        if not merge_on:
+            return 422, {'error': {'type': 'INVALID_REQUEST_UNKNOWN', 'message': 'fieldsToMergeOn is required'}}
+        with self._lock:
+            by_key = {tuple(record['fields'].get(field) for field in merge_on): record_id
+                      for record_id, record in self.tables[(base, table)].items()}
+            ids, created, updated = [], [], []
+            for record in records:
+                fields = record.get('fields', {})
+                key = tuple(fields.get(field) for field in merge_on)
+                if key in by_key:
+                    record_id = by_key[key]
+                    stored = self.tables[(base, table)][record_id]
+                    stored['fields'].update(fields)
+                    stored['modified'] = _now()
+                    updated.append(record_id)
+                else:
+                    record_id = by_key[key] = self._insert(base, table, fields)
+                    created.append(record_id)
+                ids.append(record_id)
+            return 200, {'records': [self._record(base, table, record_id) for record_id in ids],
+                         'createdRecords': created, 'updatedRecords': updated}
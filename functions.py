@@ -1,19 +1,33 @@
-from datetime import datetime, timedelta
-from collections import Counter
+from datetime import datetime, timedelta, timezone
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
 import os
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 import re
 import random
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from tqdm import tqdm
 from dotenv import load_dotenv
 from time import sleep
 import time
-import airtable
+import queue
+import threading
+from collections import deque
+from urllib.parse import urlparse
+import json
+import gzip
+import hashlib
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from selenium.common.exceptions import WebDriverException, TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
 
 
 def start_finish_times(date):
@@ -43,6 +57,114 @@ def start_finish_times(date):
         
     return start_datetime, finish_datetime
 
+def parse_xceed_dates(dates):
+    # Column-wise version of start_finish_times for a whole Series of Xceed dates such as
+    # "Sat, 23 Nov 2024 | 23:59 - 07:00"; finishing times earlier than the start roll over
+    # to the next day. Each distinct string is only parsed once; missing dates give NaT.
+    codes, uniques = pd.factorize(dates)
+    # One NaT slot at the end, picked by the -1 code factorize gives missing values
+    start = finish = np.full(len(uniques) + 1, np.datetime64('NaT'), dtype='datetime64[ns]')
+    if len(uniques):
+        uniques = pd.Series(uniques)
+        parts = uniques.str.split('|', n=1, expand=True)
+        day = pd.to_datetime(parts[0].str.strip(), format='%a, %d %b %Y')
+        times = parts[1].str.extract(r'(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})').astype(np.int64)
+        start_times = day + pd.to_timedelta(times[0] * 60 + times[1], unit='min')
+        finish_times = day + pd.to_timedelta(times[2] * 60 + times[3], unit='min')
+        finish_times = finish_times.where(finish_times >= start_times, finish_times + pd.Timedelta(days=1))
+        start = np.append(start_times.to_numpy(), np.datetime64('NaT'))
+        finish = np.append(finish_times.to_numpy(), np.datetime64('NaT'))
+    return (pd.Series(start[codes], index=dates.index),
+            pd.Series(finish[codes], index=dates.index))
+
+# Placeholder strings used in the cleaned ticket_price / remain_prices columns
+SOLD_OUT = 'SOLD OUT'
+NO_PRICE_INFO = 'No information available'
+
+def price_arrays(prices):
+    # Parse a Series of cleaned price strings ("0.0, 10.0, 12.0", 'SOLD OUT',
+    # 'No information available') into flat arrays: the prices of row i are
+    # values[offsets[i]:offsets[i + 1]], plus explicit sold-out and no-info flags
+    prices = prices.fillna('NaN').astype(str).reset_index(drop=True)
+    sold_out = (prices == SOLD_OUT).to_numpy()
+    no_info = prices.isin([NO_PRICE_INFO, 'NaN', '']).to_numpy()
+
+    tokens = prices.where(~(sold_out | no_info), '').str.split(', ').explode()
+    values = pd.to_numeric(tokens, errors='coerce')
+    values = values[values.notna()]
+    counts = np.bincount(values.index.to_numpy(), minlength=len(prices))
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    return offsets, values.to_numpy(dtype=np.float64), sold_out, no_info
+
+def price_columns(prices, prefix):
+    # Typed price columns computed once at ETL time: <prefix>_min/_max/_mean/_count
+    # and the <prefix>_sold_out/_no_info flags, aligned with `prices`
+    offsets, values, sold_out, no_info = price_arrays(prices)
+    counts = np.diff(offsets)
+    rows = np.repeat(np.arange(len(counts)), counts)
+    stats = pd.Series(values).groupby(rows).agg(['min', 'max', 'mean']).reindex(range(len(counts)))
+    return pd.DataFrame({f'{prefix}_min': stats['min'].to_numpy(),
+                         f'{prefix}_max': stats['max'].to_numpy(),
+                         f'{prefix}_mean': stats['mean'].to_numpy(),
+                         f'{prefix}_count': counts,
+                         f'{prefix}_sold_out': sold_out,
+                         f'{prefix}_no_info': no_info}, index=prices.index)
+
+def _arrow_strings(values):
+    # Series/array of strings as one Arrow string array (no copy for Arrow-backed data)
+    array = pa.array(pd.Series(values).astype(pd.ArrowDtype(pa.string())).array)
+    return array.combine_chunks() if isinstance(array, pa.ChunkedArray) else array
+
+def _price_tiers(strings):
+    # Tokenise distinct scraped price strings ("Free, €10, €1,200", an Arrow string
+    # array) in one pass: Arrow splits the tiers, then each distinct tier is parsed once
+    # (the comma inside a tier can only be a thousands separator since tiers are joined
+    # with ', '). Returns offsets, codes and tiers: the prices of strings[i] are
+    # tiers[codes[offsets[i]:offsets[i + 1]]], sorted
+    lists = pc.split_pattern(strings, ', ')
+    rows = pc.list_parent_indices(lists).to_numpy()
+    tokens = pc.dictionary_encode(pc.list_flatten(lists))
+    codes = tokens.indices.to_numpy()
+    tiers = pd.Series(tokens.dictionary, dtype=pd.ArrowDtype(pa.string()))
+    tiers = tiers.str.replace(r'[€,\s]', '', regex=True).str.replace(r'(?i)^free$', '0', regex=True)
+    tiers = pd.to_numeric(tiers, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    if np.isnan(tiers).any():
+        # Drop tokens that are not prices (and the empty token of an empty string)
+        keep = ~np.isnan(tiers[codes])
+        rows, codes = rows[keep], codes[keep]
+    # Sort one integer key per token, row first and then the price's rank among the
+    # distinct tiers, and map the ranks back to codes
+    by_price = np.argsort(tiers)
+    rank = np.empty(len(tiers), dtype=np.int64)
+    rank[by_price] = np.arange(len(tiers))
+    key = np.sort(rows * len(tiers) + rank[codes])
+    counts = np.bincount(rows, minlength=len(strings))
+    return np.concatenate([[0], np.cumsum(counts)]), by_price[key % max(len(tiers), 1)], tiers
+
+def _price_strings(offsets, codes, labels, sold_out):
+    # Arrow array of the comma-joined labels[codes] of every row (a grouped join done
+    # by Arrow), with the placeholders for rows without prices
+    tokens = pa.array(labels, pa.string()).take(pa.array(codes, pa.int64()))
+    joined = pc.binary_join(pa.ListArray.from_arrays(pa.array(offsets, pa.int32()), tokens), ', ')
+    priced = np.diff(offsets) > 0
+    sold_out = np.asarray(sold_out, dtype=bool)
+    if not priced.all():
+        joined = pc.if_else(pa.array(priced), joined, pa.scalar(NO_PRICE_INFO))
+    if sold_out.any():
+        joined = pc.if_else(pa.array(sold_out), pa.scalar(SOLD_OUT), joined)
+    return joined
+
+def clean_prices(raw, empty=NO_PRICE_INFO):
+    # Series-level replacement for .apply(clean_sorted_prices). Scraped price lists
+    # repeat a lot, so each distinct string is tokenised and joined only once
+    strings = pc.dictionary_encode(_arrow_strings(raw.fillna('').astype(str)))
+    offsets, codes, tiers = _price_tiers(strings.dictionary)
+    sold_out = (np.diff(offsets) == 0) & (empty == SOLD_OUT)
+    prices = _price_strings(offsets, codes, [str(t) for t in tiers], sold_out)
+    prices = prices.take(strings.indices).to_pandas()
+    prices.index = raw.index
+    return prices
+
 def clean_sorted_prices(x):
     clean = x.replace('€', '').replace('Free', '0').replace(',', '')
     sorted_float = sorted([float(i) for i in clean.split(' ')])
@@ -55,50 +177,186 @@ def clean_sorted_last_prices(x):
     smallest_value = str(sorted_float[0]).replace('0.11', 'SOLD OUT')
     return smallest_value
 
+def _genre_dictionary(strings):
+    # Distinct genre strings -> genre codes, as flat arrays: the genres of strings[i]
+    # are genre_names[genre_codes[offsets[i]:offsets[i + 1]]]
+    split = [g.split(', ') for g in strings]
+    genre_codes, genre_names = pd.factorize(pd.Series([g for gs in split for g in gs], dtype=object))
+    offsets = np.concatenate([[0], np.cumsum([len(gs) for gs in split])]).astype(np.int64)
+    return offsets, genre_codes, np.asarray(genre_names, dtype=object)
+
+def genre_counts(df, by='city', top_n=10, column='event_genres'):
+    # Top-N genres for every group of `by` (a column name or a list of them, e.g.
+    # 'city', 'district', 'starting_day' or ['city', 'free_entrance']) in one pass.
+    # Events repeat the same genre strings, so each distinct string is split once and
+    # the group x genre counts come from integer bincounts. Groups keep the order in
+    # which they first appear in df, tied genres the order in which genres first appear
+    by = [by] if isinstance(by, str) else list(by)
+    genres = df[column]
+    valid = (genres.notna() & (genres != 'NaN')).to_numpy()
+    keys = df.loc[valid, by]
+    group = keys.groupby(by, sort=False, dropna=False).ngroup().to_numpy()
+    string_codes, strings = pd.factorize(genres[valid])
+    offsets, genre_codes, genre_names = _genre_dictionary(strings)
+
+    # Events per (group, genre string), then spread each count over the string's genres
+    n_groups, n_strings, n_genres = group.max(initial=-1) + 1, len(strings), len(genre_names)
+    pairs, events = np.unique(group * n_strings + string_codes, return_counts=True)
+    pair_group, pair_string = np.divmod(pairs, max(n_strings, 1))
+    lengths = np.diff(offsets)[pair_string]
+    start = np.repeat(offsets[pair_string] - np.cumsum(lengths) + lengths, lengths)
+    genre = genre_codes[start + np.arange(lengths.sum())]
+    counts = np.bincount(np.repeat(pair_group, lengths) * n_genres + genre,
+                         weights=np.repeat(events, lengths), minlength=n_groups * n_genres)
+    counts = counts.reshape(n_groups, n_genres).astype(np.int64)
+
+    top = np.argsort(-counts, axis=1, kind='stable')[:, :top_n]
+    top_counts = np.take_along_axis(counts, top, axis=1)
+    rows, ranks = np.nonzero(top_counts)
+    result = keys.iloc[np.unique(group, return_index=True)[1][rows]].reset_index(drop=True)
+    result['genero'] = genre_names[top[rows, ranks]]
+    result['frecuencia'] = top_counts[rows, ranks]
+    return result
+
 def top10_generos(df):
-    # Initialize an empty list to store results
-    result = []
+    # Top 10 genres per city, as columns genero / frecuencia / city
+    return genre_counts(df, 'city')[['genero', 'frecuencia', 'city']]
 
-    # Iterate over each city in the DataFrame
-    for city in df['city'].unique():
-        # Get the list of genres for the current city
-        city_genres = df[df['city'] == city]['event_genres']
-        
-        # Split genres for each event in the city
-        lista_generos = [x.split(', ') for x in city_genres]
-        
-        # Flatten the list of lists into a single list for the city
-        nueva_lista = []
-        for l in lista_generos:
-            nueva_lista.extend(l)
+class GenreIndex:
+    # One boolean column per genre over an events frame, built once when the data is
+    # loaded. A genre filter is then an OR (or AND) of a few columns that combines with
+    # the city / free / sold-out masks, instead of a rescan of the event_genres strings
+    def __init__(self, genres):
+        string_codes, strings = pd.factorize(genres.where(genres != 'NaN'))
+        offsets, genre_codes, genre_names = _genre_dictionary(strings)
 
-        # Count the occurrences of each genre in the city
-        conteo = Counter(nueva_lista)
-        
-        # Convert the count into a DataFrame for the current city
-        df_gener = pd.DataFrame({'genero': list(conteo.keys()), 'frecuencia': list(conteo.values())})
-        
-        # Sort by frequency and get the top 10 genres
-        df_gener = df_gener.sort_values('frecuencia', ascending=False, ignore_index=True).head(10)
-        
-        # Add the city column to the result
-        df_gener['city'] = city
-        
-        # Append the city result to the main list
-        result.append(df_gener)
-        
-        # if there is only one city, return the DataFrame
-        if len(df['city'].unique()) == 1:
-            return df_gener
-        
-        else:
-            continue
-    # Concatenate all results into one DataFrame
-    df_result = pd.concat(result, ignore_index=True)
-    
-    return df_result
+        # Genres of each distinct string, plus an empty last row for events without genres
+        by_string = np.zeros((len(strings) + 1, len(genre_names)), dtype=bool)
+        by_string[np.repeat(np.arange(len(strings)), np.diff(offsets)), genre_codes] = True
+        self.columns = np.asfortranarray(by_string[string_codes])
+
+        # Most common genres first, for the dashboard's genre picker
+        order = np.argsort(-self.columns.sum(axis=0), kind='stable')
+        self.genres = genre_names[order].tolist()
+        self.position = {genre: i for i, genre in enumerate(genre_names)}
+
+    def __len__(self):
+        return self.columns.shape[0]
+
+    def mask(self, genres, match='any'):
+        # Events with any (or all) of the given genres; no genres selects every event
+        if not genres:
+            return np.ones(len(self), dtype=bool)
+        columns = [self.columns[:, self.position[genre]] for genre in genres]
+        mask = columns[0].copy()
+        for column in columns[1:]:
+            if match == 'all':
+                mask &= column
+            else:
+                mask |= column
+        return mask
+
+# Site the scrapers crawl (pointed at a local server by the benchmarks)
+XCEED_BASE_URL = 'https://xceed.me'
+
+# Starting and maximum requests/sec for each host the project talks to, and optionally
+# how many requests may go out back to back (default: one second's worth). Airtable
+# allows 5 requests in any one-second window, so its requests are spaced evenly and
+# kept a little under the limit to leave room for network jitter
+HOST_RATE_LIMITS = {
+    'xceed.me': {'rate': 1.0, 'max_rate': 10.0},
+    'api.airtable.com': {'rate': 4.8, 'max_rate': 4.8, 'burst': 1},
+    'nominatim.openstreetmap.org': {'rate': 1.0, 'max_rate': 1.0},
+}
 
-def fetch_airtable_data(view_name = None, endpoint = None, headers = None):
+class RateLimiter:
+    # Token bucket per host with AIMD pacing: the rate grows by `increase` req/s after
+    # each healthy response and is multiplied by `decrease` after a 429/5xx or a
+    # response slower than `slow_after` seconds.
+    def __init__(self, limits=HOST_RATE_LIMITS, default_rate=1.0, increase=0.1, decrease=0.5,
+                 slow_after=5.0, min_rate=0.1, window=60):
+        self.limits = limits
+        self.default_rate = default_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_after = slow_after
+        self.min_rate = min_rate
+        self.window = window
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _host_key(self, host):
+        if '://' in host:
+            host = urlparse(host).hostname
+        for key in self.limits:
+            if host == key or host.endswith('.' + key):
+                return key
+        return host
+
+    def _bucket(self, key):
+        if key not in self._buckets:
+            limit = self.limits.get(key, {'rate': self.default_rate, 'max_rate': self.default_rate})
+            self._buckets[key] = {'rate': limit['rate'], 'max_rate': limit['max_rate'], 'burst': limit.get('burst'),
+                                  'tokens': 1.0, 'updated': time.monotonic(), 'sent': deque()}
+        return self._buckets[key]
+
+    def wait(self, host):
+        # Block until a request to `host` is allowed
+        key = self._host_key(host)
+        while True:
+            with self._lock:
+                bucket = self._bucket(key)
+                now = time.monotonic()
+                capacity = bucket['burst'] or max(1.0, bucket['rate'])
+                bucket['tokens'] = min(capacity, bucket['tokens'] + (now - bucket['updated']) * bucket['rate'])
+                bucket['updated'] = now
+                if bucket['tokens'] >= 1:
+                    bucket['tokens'] -= 1
+                    bucket['sent'].append(now)
+                    return
+                delay = (1 - bucket['tokens']) / bucket['rate']
+            time.sleep(delay)
+
+    def record(self, host, status=200, elapsed=0.0):
+        # Feed the outcome of a request back into the host's rate
+        with self._lock:
+            bucket = self._bucket(self._host_key(host))
+            if status == 429 or status >= 500 or elapsed > self.slow_after:
+                bucket['rate'] = max(self.min_rate, bucket['rate'] * self.decrease)
+            else:
+                bucket['rate'] = min(bucket['max_rate'], bucket['rate'] + self.increase)
+
+    def achieved_rate(self, host):
+        # Requests/sec actually sent to `host` over the last `window` seconds
+        with self._lock:
+            sent = self._bucket(self._host_key(host))['sent']
+            now = time.monotonic()
+            while sent and sent[0] < now - self.window:
+                sent.popleft()
+            if not sent:
+                return 0.0
+            return len(sent) / max(now - sent[0], 1.0)
+
+    def stats(self):
+        hosts = list(self._buckets)
+        return pd.DataFrame({'host': hosts,
+                             'rate': [round(self._buckets[host]['rate'], 2) for host in hosts],
+                             'achieved_rate': [round(self.achieved_rate(host), 2) for host in hosts]})
+
+# Shared by every fetch path in the project
+RATE_LIMITER = RateLimiter()
+
+def rate_limited_request(method, url, session=None, limiter=None, **kwargs):
+    limiter = limiter or RATE_LIMITER
+    limiter.wait(url)
+    start = time.monotonic()
+    response = (session or requests).request(method, url, **kwargs)
+    limiter.record(url, response.status_code, time.monotonic() - start)
+    return response
+
+def fetch_airtable_data(view_name = None, endpoint = None, headers = None, fields = None, formula = None, client = None):
+    # Page through a table; `fields` limits the returned fields and `formula` is an
+    # Airtable filterByFormula expression
     all_records = []
     offset = None
 
@@ -106,7 +364,11 @@ def fetch_airtable_data(view_name = None, endpoint = None, headers = None):
         params = {"offset": offset} if offset else {}
         if view_name:
             params["view"] = view_name
-        response = requests.get(endpoint, headers=headers, params=params)
+        if fields:
+            params["fields[]"] = list(fields)
+        if formula:
+            params["filterByFormula"] = formula
+        response = (client or AIRTABLE_CLIENT).request('GET', endpoint, headers=headers, params=params)
         response.raise_for_status()  # Raise exception for errors
         data = response.json()
         
@@ -120,6 +382,175 @@ def fetch_airtable_data(view_name = None, endpoint = None, headers = None):
 
     return all_records
 
+class EventStore:
+    # Local SQLite mirror of the Airtable events table: one row per event url (with the
+    # Airtable record id and the Xceed event id, both indexed) holding the record's
+    # fields as JSON. Runs split new from known events and read the table from here;
+    # Airtable is only asked for records modified since the last sync.
+    def __init__(self, path='Data/events.db'):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS events (url TEXT PRIMARY KEY, id TEXT, event_id TEXT, fields TEXT NOT NULL)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS events_id ON events (id)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS events_event_id ON events (event_id)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    @staticmethod
+    def _event_id(url):
+        match = re.search(r'\b(\d{6})\b', url)
+        return match.group(1) if match else None
+
+    def _upsert(self, rows, merge):
+        # rows: (url, id or None, fields dict). With merge=True the fields are patched
+        # into the stored ones instead of replacing them
+        fields_sql = "json_patch(events.fields, excluded.fields)" if merge else "excluded.fields"
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO events (url, id, event_id, fields) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET id = COALESCE(excluded.id, events.id), "
+                f"event_id = excluded.event_id, fields = {fields_sql}",
+                [(url, record_id, self._event_id(url), json.dumps(fields, default=str)) for url, record_id, fields in rows])
+
+    def merge_airtable(self, records, merge=False):
+        # Airtable records ({'id': ..., 'fields': {...}}) replace the mirrored rows, or
+        # are patched into them with merge=True (records fetched with only some fields)
+        self._upsert([(r['fields']['url'], r['id'], r['fields']) for r in records if r.get('fields', {}).get('url')],
+                     merge=merge)
+
+    def save_rows(self, df, fields=None):
+        # Rows just written to Airtable (with an 'id' column when known). Only `fields`
+        # are updated on events already in the mirror when given
+        fields = fields or [c for c in df.columns if c not in ('id', 'action')]
+        ids = df['id'] if 'id' in df else pd.Series(None, index=df.index)
+        rows = [(row['url'], None if pd.isna(record_id) else record_id, {f: row[f] for f in fields})
+                for row, record_id in zip(df[list(dict.fromkeys(['url'] + fields))].to_dict('records'), ids)]
+        self._upsert(rows, merge=True)
+
+    def lookup(self, urls):
+        # Airtable record ids for `urls` (NaN for events not in Airtable), via an
+        # indexed join instead of an isin over the whole table
+        with self._lock, self.conn:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS lookup (pos INTEGER PRIMARY KEY, url TEXT)")
+            self.conn.execute("DELETE FROM lookup")
+            self.conn.executemany("INSERT INTO lookup VALUES (?, ?)", enumerate(urls))
+            found = self.conn.execute("SELECT lookup.pos, events.id FROM lookup JOIN events ON events.url = lookup.url "
+                                      "WHERE events.id IS NOT NULL").fetchall()
+        ids = np.full(len(urls), np.nan, dtype=object)
+        for pos, record_id in found:
+            ids[pos] = record_id
+        return pd.Series(ids, index=urls.index if isinstance(urls, pd.Series) else None)
+
+    def to_dataframe(self, fields=None):
+        # The mirrored table in airtable_to_dataframe's format, optionally only `fields`
+        with self._lock:
+            if fields:
+                columns = ', '.join(f"json_extract(fields, '$.\"{field}\"')" for field in fields)
+                rows = self.conn.execute(f"SELECT id, {columns} FROM events WHERE id IS NOT NULL").fetchall()
+                return pd.DataFrame([row[1:] + (row[0],) for row in rows], columns=list(fields) + ['id'])
+            rows = self.conn.execute("SELECT id, fields FROM events WHERE id IS NOT NULL").fetchall()
+        return airtable_to_dataframe([{'id': record_id, 'fields': json.loads(fields)} for record_id, fields in rows])
+
+    def sync_from_airtable(self, endpoint, headers, view_name=None, full=False, overlap=60, fields=None, chunk_size=100,
+                           full_every_days=7):
+        # Pull the records changed in Airtable since the previous sync. The whole table is
+        # downloaded on the first sync, with full=True, or when the last full sync is more
+        # than `full_every_days` old: only a full sync drops records deleted in Airtable
+        # and picks up edits to fields outside `fields`. With `fields`, an incremental sync
+        # downloads only those fields and patches them into the mirrored rows; records the
+        # mirror has never seen are then fetched whole, by record id in chunks of `chunk_size`
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'watermark'").fetchone()
+            last_full = self.conn.execute("SELECT value FROM meta WHERE key = 'full_sync'").fetchone()
+        started = datetime.now(timezone.utc)
+        stale = last_full is None or started - datetime.fromisoformat(last_full[0]) > timedelta(days=full_every_days)
+        incremental = row is not None and not full and not stale and len(self) > 0
+        records = fetch_airtable_data(view_name=view_name, endpoint=endpoint, headers=headers,
+                                      fields=list(dict.fromkeys(['url'] + list(fields))) if incremental and fields else None,
+                                      formula=f"IS_AFTER(LAST_MODIFIED_TIME(), '{row[0]}')" if incremental else None)
+        if not incremental:
+            with self._lock, self.conn:
+                self.conn.execute("DELETE FROM events WHERE id IS NOT NULL")
+                self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('full_sync', ?)", (started.isoformat(),))
+            self.merge_airtable(records)
+        elif fields:
+            known = self.lookup(pd.Series([r.get('fields', {}).get('url') for r in records], dtype=object)).notna()
+            self.merge_airtable([r for r, is_known in zip(records, known) if is_known], merge=True)
+            unknown = [r['id'] for r, is_known in zip(records, known) if not is_known and r.get('fields', {}).get('url')]
+            for i in range(0, len(unknown), chunk_size):
+                ids = ', '.join(f"RECORD_ID() = '{record_id}'" for record_id in unknown[i:i + chunk_size])
+                self.merge_airtable(fetch_airtable_data(view_name=view_name, endpoint=endpoint, headers=headers,
+                                                        formula=f"OR({ids})"))
+        else:
+            self.merge_airtable(records)
+
+        watermark = (started - timedelta(seconds=overlap)).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('watermark', ?)", (watermark,))
+        print(f"Synced {len(records)} {'changed ' if incremental else ''}records from Airtable ({len(self)} events in {self.path})")
+        return len(records)
+
+    def close(self):
+        self.conn.close()
+
+def coordinate_key(location):
+    # "lat,lon" (location_identifier) rounded to 6 decimals (~10 cm), so the same venue
+    # written with different float noise is geocoded once
+    lat, lon = location.split(',')[:2]
+    return f'{float(lat):.6f},{float(lon):.6f}'
+
+class GeocodeCache:
+    # Persistent reverse-geocoding results (SQLite): coordinate key -> district and when
+    # it was looked up. Entries older than `ttl_days` are treated as missing so venues
+    # are re-checked now and then.
+    def __init__(self, path='Data/geocode.db', ttl_days=180):
+        self.path = path
+        self.ttl_days = ttl_days
+        self.conn = sqlite3.connect(path)
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS districts (coordinate TEXT PRIMARY KEY, district TEXT NOT NULL, "
+                              "looked_up TEXT NOT NULL)")
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM districts").fetchone()[0]
+
+    def get(self):
+        # {coordinate: district} for every entry still within the TTL
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=self.ttl_days)).isoformat()
+        return dict(self.conn.execute("SELECT coordinate, district FROM districts WHERE looked_up >= ?", (cutoff,)))
+
+    def put(self, coordinate, district):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO districts VALUES (?, ?, ?)",
+                              (coordinate, district, datetime.now(timezone.utc).isoformat()))
+
+    def close(self):
+        self.conn.close()
+
+def reverse_geocode(locations, lookup, cache=None):
+    # District for each "lat,lon" in `locations` (a Series). Every distinct venue is
+    # resolved once, from `cache` when it has a fresh entry and otherwise with
+    # lookup(lat, lon), which should do its own rate limiting and return None on
+    # failure; failures are not cached and come back as 'Unknown'. New answers are
+    # saved as they arrive, so an interrupted run keeps its progress
+    codes, coordinates = pd.factorize(locations.map(coordinate_key))
+    known = cache.get() if cache is not None else {}
+    missing = [coordinate for coordinate in coordinates if coordinate not in known]
+    for coordinate in tqdm(missing, desc='Geocoding new venues', disable=not missing):
+        district = lookup(*coordinate.split(','))
+        if district is not None:
+            known[coordinate] = district
+            if cache is not None:
+                cache.put(coordinate, district)
+    print(f"Geocoded {len(missing)} new venues ({len(coordinates) - len(missing)} of {len(coordinates)} cached)")
+    districts = np.array([known.get(coordinate, 'Unknown') for coordinate in coordinates], dtype=object)
+    return pd.Series(districts[codes], index=locations.index)
+
 # Convert Airtable data to DataFrame
 def airtable_to_dataframe(records):
     
@@ -130,205 +561,556 @@ def airtable_to_dataframe(records):
         rows.append(row)
     return pd.DataFrame(rows)
 
-def scraping_xceed_urls(ciudades, finish_date):
-    for ciudad in ciudades:
-        
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")  # Run headlessly
-        chrome_options.add_argument("--disable-gpu")  # Disable GPU
-        chrome_options.add_argument("--disable-webgl")  # Disable WebGL
-        chrome_options.add_argument("--disable-software-rasterizer")  # Disable fallback
-        chrome_options.add_argument("--disable-features=WebGPU")  # Disable WebGPU
-
-        browser = webdriver.Chrome(options=chrome_options)
-
-        browser.get(f"https://xceed.me/en/{ciudad.lower()}/events/all/all-events")
-
-        # browser.maximize_window()
-
-        sleep(random.uniform(1, 3))
-
-        datos_date = datetime.now().date()
-        
-
-        while datos_date < finish_date.date():
-            scroll_increment = random.randint(500, 1000)
-            browser.execute_script("window.scrollBy(0, " + str(scroll_increment) + ");")
-            
-            sleep(random.uniform(1, 3))
-            
-            browser.page_source
-            
-            soup = BeautifulSoup(browser.page_source, 'html.parser')
-            
-            places = []
-            urls = []
-            image = []
-            date = []
-
-            for i in soup.find_all('a'):
-                if re.match(r'.*\b\d{6}\b', str(i['href'])):  
-                # href
-                    try:
-                        url = i['href']
-                    except:
-                        url = np.nan
-                # local
-                    try:
-                        local = i.find('h4').text
-                    except:
-                        local = np.nan
-                # date
-                    try:
-                        day = i.find('h5').text
-                    except:
-                        day = i.find('h5')
-                # IMAGES
-                    try:
-                        img = i.find('img',alt=re.compile(r"^Cover for event"), attrs={'loading': 'lazy'})['src']
-                    except:
-                        img = np.nan
-
-                    d_str = day.split('|')[0].strip()
-                    datos_date  = datetime.strptime(d_str.strip(), "%a, %d %b %Y")
-                    datos_date  = datos_date.date()
-                    
-                    urls.append(f'https://xceed.me{url}')
-                    places.append(local)
-                    date.append(day)
-                    image.append(img)
-                    
-        browser.quit()
-        
-        return pd.DataFrame({'place': places, 'url': urls, 'image': image, 'date': date})
-    
-def update_xceed_data(df):  
-    
+def chrome_options():
     chrome_options = Options()
     chrome_options.add_argument("--headless")  # Run headlessly
     chrome_options.add_argument("--disable-gpu")  # Disable GPU
     chrome_options.add_argument("--disable-webgl")  # Disable WebGL
     chrome_options.add_argument("--disable-software-rasterizer")  # Disable fallback
     chrome_options.add_argument("--disable-features=WebGPU")  # Disable WebGPU
-    
-    event_genres = []
-    line_up = []
-    venue_information = []
-    event_location_details = []
-    event_ticket_types = []
-    ticket_price = []
-    event_name = []
-    location_identifier = []
-    location_address = []
-    remain_prices = []
+    return chrome_options
 
-    # Start time for execution time calculation
+class BrowserPool:
+    # Fixed number of long-lived headless Chrome sessions reused across page loads.
+    # A session is recycled after `max_pages` loads or as soon as it crashes, and
+    # every session that was started is quit when the pool is closed.
+    def __init__(self, size=1, max_pages=50, options=None, retries=1):
+        self.size = size
+        self.max_pages = max_pages
+        self.options = options if options is not None else chrome_options()
+        self.retries = retries
+        self._idle = queue.Queue()
+        self._pages = {}
+        self._lock = threading.Lock()
+        # Sessions are started lazily, the first time a slot is used
+        for _ in range(size):
+            self._idle.put(None)
+
+    def _start(self):
+        browser = webdriver.Chrome(options=self.options)
+        with self._lock:
+            self._pages[browser] = 0
+        return browser
+
+    def _discard(self, browser):
+        with self._lock:
+            self._pages.pop(browser, None)
+        try:
+            browser.quit()
+        except Exception:
+            pass
+
+    def page_source(self, url):
+        browser = self._idle.get()
+        try:
+            for attempt in range(self.retries + 1):
+                if browser is None:
+                    browser = self._start()
+                try:
+                    RATE_LIMITER.wait(url)
+                    start = time.monotonic()
+                    browser.get(url)
+                    html = browser.page_source
+                    RATE_LIMITER.record(url, 200, time.monotonic() - start)
+                except WebDriverException:
+                    # The session crashed or hung: replace it and try again
+                    RATE_LIMITER.record(url, 500)
+                    self._discard(browser)
+                    browser = None
+                    if attempt == self.retries:
+                        raise
+                    continue
+
+                with self._lock:
+                    self._pages[browser] += 1
+                    recycle = self._pages[browser] >= self.max_pages
+                if recycle:
+                    self._discard(browser)
+                    browser = None
+                return html
+        finally:
+            self._idle.put(browser)
+
+    def close(self):
+        with self._lock:
+            browsers = list(self._pages)
+        for browser in browsers:
+            self._discard(browser)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+class SnapshotStore:
+    # Compressed, content-addressed store of fetched listing and detail pages.
+    # Page bodies are gzipped under objects/<sha256[:2]>/<sha256>.html.gz, so an
+    # unchanged page is stored once; index.jsonl has one line per fetch with the
+    # url, page kind, fetch time and content hash.
+    def __init__(self, root='Data/snapshots'):
+        self.root = root
+        self.index_path = os.path.join(root, 'index.jsonl')
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+        self._lock = threading.Lock()
+        self._index = None
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], f'{digest}.html.gz')
+
+    def _load_index(self):
+        if self._index is None:
+            self._index = []
+            if os.path.exists(self.index_path):
+                with open(self.index_path, encoding='utf-8') as f:
+                    self._index = [json.loads(line) for line in f if line.strip()]
+        return self._index
+
+    def put(self, url, html, kind='event', fetched_at=None):
+        data = html.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+            with gzip.open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        entry = {'url': url, 'kind': kind,
+                 'fetched_at': (fetched_at or datetime.now()).isoformat(timespec='seconds'),
+                 'sha256': digest}
+        with self._lock:
+            self._load_index().append(entry)
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+        return digest
+
+    def get(self, digest):
+        with gzip.open(self._object_path(digest), 'rb') as f:
+            return f.read().decode('utf-8')
+
+    def index(self, kind=None, until=None):
+        with self._lock:
+            df = pd.DataFrame(self._load_index(), columns=['url', 'kind', 'fetched_at', 'sha256'])
+        if kind is not None:
+            df = df[df['kind'] == kind]
+        if until is not None:
+            df = df[df['fetched_at'] <= until.isoformat(timespec='seconds')]
+        return df
+
+    def latest(self, kind=None, until=None):
+        # Most recent snapshot of every url fetched at or before `until`
+        df = self.index(kind=kind, until=until)
+        return df.sort_values('fetched_at').drop_duplicates('url', keep='last').reset_index(drop=True)
+
+    def latest_page(self, url, until=None):
+        df = self.latest(until=until)
+        match = df[df['url'] == url]
+        return self.get(match['sha256'].iloc[0]) if not match.empty else None
+
+def parse_listing_page(html):
+    # Event cards of a saved listing page, same columns as scrape_city_listing
+    events = {}
+    for a in lxml.html.fromstring(html).iter('a'):
+        href = a.get('href', '')
+        match = re.search(r'\b(\d{6})\b', href)
+        h5 = next(a.iter('h5'), None)
+        if match is None or h5 is None or match.group(1) in events:
+            continue
+        h4 = next(a.iter('h4'), None)
+        img = next((img for img in a.iter('img')
+                    if img.get('alt', '').startswith('Cover for event') and img.get('loading') == 'lazy'), None)
+        events[match.group(1)] = {'place': h4.text_content() if h4 is not None else np.nan,
+                                  'url': f'{XCEED_BASE_URL}{href}',
+                                  'image': img.get('src') if img is not None else np.nan,
+                                  'date': h5.text_content()}
+    return pd.DataFrame(list(events.values()), columns=['place', 'url', 'image', 'date'])
+
+# Runs in the page: returns the rendered event anchors that were not returned by a
+# previous call and marks them, so each scroll step only ships the newly loaded cards.
+COLLECT_NEW_EVENTS_JS = r"""
+const rows = [];
+document.querySelectorAll('a[href]:not([data-collected])').forEach(a => {
+    const href = a.getAttribute('href');
+    const h5 = a.querySelector('h5');
+    if (!/\b\d{6}\b/.test(href) || !h5) return;
+    a.setAttribute('data-collected', '1');
+    const h4 = a.querySelector('h4');
+    const img = a.querySelector('img[alt^="Cover for event"][loading="lazy"]');
+    rows.push([href, h4 ? h4.textContent : null, h5.textContent, img ? img.getAttribute('src') : null]);
+});
+return rows;
+"""
+
+# Whether the page has rendered event cards that COLLECT_NEW_EVENTS_JS has not returned yet
+HAS_NEW_EVENTS_JS = "return document.querySelector('a[href]:not([data-collected]) h5') !== null;"
+
+def scrape_city_listing(browser, ciudad, finish_date, max_idle_scrolls=10, snapshots=None, load_timeout=10,
+                        start_date=None):
+    # Events are collected from `start_date` (today by default) until `finish_date`.
+    # Scrolls are paced by the host's rate limiter (without feeding it back, only real
+    # page loads adjust the rate); after each one, wait up to `load_timeout` seconds for
+    # the lazy-loaded cards. Only scrolls that load nothing within the timeout count
+    # towards `max_idle_scrolls`
+
+    listing_url = f"{XCEED_BASE_URL}/en/{ciudad.lower()}/events/all/all-events"
+    RATE_LIMITER.wait(listing_url)
+    start = time.monotonic()
+    browser.get(listing_url)
+    RATE_LIMITER.record(listing_url, 200, time.monotonic() - start)
+
+    # Events keyed by their 6-digit id, in the order they appear on the page
+    events = {}
+    datos_date = (start_date or datetime.now()).date()
+    idle_scrolls = 0
+
+    while datos_date < finish_date.date() and idle_scrolls < max_idle_scrolls:
+        new_rows = browser.execute_script(COLLECT_NEW_EVENTS_JS)
+
+        for href, local, day, img in new_rows:
+            event_id = re.search(r'\b(\d{6})\b', href).group(1)
+            if event_id in events:
+                continue
+
+            d_str = day.split('|')[0].strip()
+            datos_date = datetime.strptime(d_str, "%a, %d %b %Y").date()
+
+            events[event_id] = {'place': local if local is not None else np.nan,
+                                'url': f'{XCEED_BASE_URL}{href}',
+                                'image': img if img is not None else np.nan,
+                                'date': day}
+
+        # Stop once the cutoff is reached, or when scrolling stops loading new events
+        idle_scrolls = 0 if new_rows else idle_scrolls + 1
+        if datos_date >= finish_date.date():
+            break
+
+        scroll_increment = random.randint(500, 1000)
+        RATE_LIMITER.wait(listing_url)
+        browser.execute_script("window.scrollBy(0, " + str(scroll_increment) + ");")
+
+        try:
+            WebDriverWait(browser, load_timeout, poll_frequency=0.25).until(
+                lambda b: b.execute_script(HAS_NEW_EVENTS_JS))
+        except TimeoutException:
+            pass
+
+    if snapshots is not None:
+        snapshots.put(listing_url, browser.page_source, kind='listing')
+
+    return pd.DataFrame(list(events.values()), columns=['place', 'url', 'image', 'date'])
+
+def scrape_city(ciudad, finish_date, snapshots=None, start_date=None):
     start_time = time.time()
+
+    browser = webdriver.Chrome(options=chrome_options())
+
+    try:
+        df_city = scrape_city_listing(browser, ciudad, finish_date, snapshots=snapshots, start_date=start_date)
+    finally:
+        browser.quit()
+
+    df_city['city'] = ciudad
+    return df_city, time.time() - start_time
+
+def scraping_xceed_urls(ciudades, finish_date, workers=None, snapshots=None, start_date=None):
+    # Each city is listed by its own worker and browser, concurrently
+    workers = workers or len(ciudades)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda ciudad: scrape_city(ciudad, finish_date, snapshots, start_date), ciudades))
+
+    # Per-city timing and counts
+    report = pd.DataFrame({'city': ciudades,
+                           'events': [len(df_city) for df_city, _ in results],
+                           'seconds': [round(seconds, 2) for _, seconds in results]})
+    print(report.to_string(index=False))
+
+    df = pd.concat([df_city for df_city, _ in results], ignore_index=True)
+    df.attrs['city_report'] = report
+    return df
     
-    urls = df['url'].tolist()
+# Declarative field specs for event detail pages: (field, tag, attribute test, output).
+# An attribute test is None, (attr,) for "has attr", or (attr, value); for 'class'
+# the value only has to be one of the element's classes.
+EVENT_FIELD_SPECS = [
+    ('event_title', 'h1', None, 'first_text'),
+    ('event_genres', 'span', ('name',), 'joined_text'),
+    ('line_up', 'div', ('class', 'LineUp-sc-1xigslr-0'), 'first_h3_text'),
+    ('venue_information', 'div', ('overflow', 'hidden'), 'first_squashed_text'),
+    ('event_location_details', 'div', ('overflow', 'hidden'), 'second_squashed_text'),
+    ('event_ticket_types', 'h3', ('class', 'Name-sc-17wxn8u-0'), 'unique_text'),
+    ('ticket_price', 'p', ('class', 'PriceText-sc-17wxn8u-2'), 'unique_stripped_text'),
+    ('location_identifier', 'a', ('class', 'TertiaryTitle-sc-hrr11b-4'), 'first_href_param'),
+    ('location_address', 'p', ('color', '#6E7A83'), 'first_text'),
+    # con 'inherit' nos va a enseñar las entradas que quedan
+    ('remain_prices', 'p', ('class', 'PriceText-sc-17wxn8u-2'), 'unique_inherit_text'),
+]
 
-    for url in tqdm(urls, desc='Processing events', unit='url'):
+def _attribute_test(test):
+    if test is None:
+        return lambda el: True
+    if len(test) == 1:
+        name = test[0]
+        return lambda el: name in el.attrib
+    name, value = test
+    if name == 'class':
+        return lambda el: value in el.get('class', '').split()
+    return lambda el: el.get(name) == value
 
-        browser = webdriver.Chrome(options=chrome_options)
+def _squash(text):
+    return re.sub(r'\s+', ' ', text).strip()
 
-        browser.get(url)
+def _href_param(el):
+    href = el.get('href')
+    return href.split('=')[-1] if href is not None else np.nan
 
-        # browser.maximize_window()
+# How the matched elements (in document order) become a field value
+FIELD_OUTPUTS = {
+    'first_text': lambda els: els[0].text_content() if els else np.nan,
+    'joined_text': lambda els: ', '.join(el.text_content() for el in els),
+    'first_h3_text': lambda els: ', '.join(h3.text_content() for h3 in els[0].iter('h3')) if els else np.nan,
+    'first_squashed_text': lambda els: _squash(els[0].text_content()) if els else np.nan,
+    'second_squashed_text': lambda els: _squash(els[1].text_content()) if len(els) > 1 else np.nan,
+    'unique_text': lambda els: ', '.join(dict.fromkeys(el.text_content() for el in els)),
+    'unique_stripped_text': lambda els: ', '.join(dict.fromkeys(el.text_content().strip() for el in els)),
+    'unique_inherit_text': lambda els: ', '.join(dict.fromkeys(el.text_content().strip() for el in els
+                                                               if 'inherit' in etree.tostring(el, encoding='unicode', with_tail=False))),
+    'first_href_param': lambda els: _href_param(els[0]) if els else np.nan,
+}
 
-        browser.page_source
-            
-        soup2 = BeautifulSoup(browser.page_source, "html.parser")
+def compile_field_specs(specs):
+    # Group the specs by tag so a single document traversal can dispatch every element
+    by_tag = {}
+    for field, tag, test, output in specs:
+        by_tag.setdefault(tag, []).append((field, _attribute_test(test)))
+    outputs = [(field, FIELD_OUTPUTS[output]) for field, _, _, output in specs]
+    return tuple(by_tag), by_tag, outputs
 
-    #event_name
-        try:
-            ev_name = soup2.find('h1').text
-        except:
-            ev_name = np.nan
-    # genre     
-        try:
-            event_genre = ', '.join([x.text for x in soup2.find_all('span', attrs={'name': True})])
+EVENT_FIELDS = compile_field_specs(EVENT_FIELD_SPECS)
 
-        except:
-            event_genre = np.nan
+def extract_fields(html, compiled=EVENT_FIELDS):
+    tags, by_tag, outputs = compiled
+    matches = {field: [] for field, _ in outputs}
 
-    # line up
-        try:       
-            event_lineup = ', '.join([x.text for x in soup2.find('div', class_ = 'LineUp-sc-1xigslr-0').find_all('h3')])
+    try:
+        root = lxml.html.fromstring(html)
+    except (etree.ParserError, ValueError):
+        root = None
 
-        except:
-            event_lineup = np.nan
+    if root is not None:
+        for el in root.iter(*tags):
+            for field, test in by_tag[el.tag]:
+                if test(el):
+                    matches[field].append(el)
 
-    # Venue information
-        try:
-            v_info = soup2.find_all('div', attrs={'overflow':'hidden'})[0].text
-            venue_info = re.sub(r'\s+', ' ', v_info).strip()
+    return {field: output(matches[field]) for field, output in outputs}
 
-        except:
-            venue_info = np.nan
-            
-    # Venue local information
-        try:
-            v_local_info = soup2.find_all('div', attrs={'overflow':'hidden'})[1].text
-            venue_local_info = re.sub(r'\s+', ' ', v_local_info).strip()
+def parse_event_page(html):
+    return extract_fields(html, EVENT_FIELDS)
 
-        except:
-            venue_local_info = np.nan
+def fetch_event_data(url, pool, snapshots=None):
+    html = pool.page_source(url)
+    if snapshots is not None:
+        snapshots.put(url, html, kind='event')
+    return parse_event_page(html)
 
-    # ticket_type
-        try:
-            unique_ticket_types = {x.text for x in soup2.find_all('h3', class_ = 'Name-sc-17wxn8u-0')}
-            ticket_types = ', '.join(unique_ticket_types)
+# Fields that must be present in the server-rendered HTML for the HTTP fetch to be trusted.
+# The ticket types stand in for the ticket block: when it is rendered client-side the
+# HTTP page has no prices, which would be written to Airtable as 'No information available'
+REQUIRED_EVENT_FIELDS = ['event_title', 'location_identifier', 'location_address', 'event_ticket_types']
 
-        except:
-            ticket_types = np.nan
-    # Ticket price
-    # Utilizamos {} para quitar los valores duplicados.       
-        try:
-            unique_ticket_prices = {x.text.strip() for x in soup2.find_all('p', class_='PriceText-sc-17wxn8u-2')}
-            ticket_prices = ', '.join(unique_ticket_prices)
+class HttpFetcher:
+    # Fetches event pages over a pooled keep-alive requests.Session and only falls
+    # back to a headless browser from `pool` when a required field is missing.
+    def __init__(self, pool=None, size=10, timeout=10, required=REQUIRED_EVENT_FIELDS, snapshots=None):
+        self.pool = pool
+        self.snapshots = snapshots
+        self.timeout = timeout
+        self.required = required
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=size, pool_maxsize=size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0 Safari/537.36'})
+        self.pages = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
 
-        except:
-            ticket_prices = np.nan
-    # ubicacion
-        try:
-            location_id = soup2.find('a', class_ ='TertiaryTitle-sc-hrr11b-4')['href'].split('=')[-1]
+    def page_source(self, url):
+        response = rate_limited_request('GET', url, session=self.session, timeout=self.timeout)
+        response.raise_for_status()
+        return response.text
 
-        except:
-            location_id = np.nan
-    # direccion
+    def fetch_event_data(self, url):
         try:
-            location = soup2.find('p', attrs={'color':'#6E7A83'}).text
+            html = self.page_source(url)
+            record = parse_event_page(html)
+        except requests.RequestException:
+            if self.pool is None:
+                raise
+            record = None
 
-        except:
-            location = np.nan
+        # Missing fields come out as NaN, or '' for the joined ones such as the ticket types
+        incomplete = record is None or any(pd.isna(record[field]) or record[field] == '' for field in self.required)
+        if incomplete and self.pool is not None:
+            # Client-side rendered page (or failed request): let Chrome render it
+            record = fetch_event_data(url, self.pool, self.snapshots)
+            with self._lock:
+                self.fallbacks += 1
+        elif self.snapshots is not None:
+            self.snapshots.put(url, html, kind='event')
+        with self._lock:
+            self.pages += 1
+        return record
+
+    def close(self):
+        self.session.close()
+
+class CrawlCheckpoint:
+    # Durable append-only JSONL of finished detail-page records, one line per URL,
+    # so a crashed crawl can be resumed without re-fetching what it already has.
+    # The first line identifies the run by its date (`run`, today by default); a
+    # checkpoint from another run date, or older than `max_age_hours`, belongs to an
+    # earlier run and is discarded instead of resumed. A rerun crawls a fresh listing,
+    # so only the finished records whose URL is still in `urls` are resumed.
+    def __init__(self, path, urls=None, run=None, max_age_hours=12):
+        self.path = path
+        self.run = run or datetime.now().date().isoformat()
+        self.max_age_hours = max_age_hours
+        self.done = {}
+        self._lock = threading.Lock()
+        header = None
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Last line cut short by the crash
+                        continue
+                    if 'url' not in record:
+                        header = record
+                        continue
+                    self.done[record.pop('url')] = record
+        if os.path.exists(path) and not self._resumable(header):
+            if self.done:
+                print(f"Discarding checkpoint {path} left by an earlier run ({len(self.done)} events)")
+            self.clear()
+        if not os.path.exists(path):
+            self._write({'started': datetime.now(timezone.utc).isoformat(), 'run': self.run})
+        if urls is not None:
+            urls = set(urls)
+            self.done = {url: record for url, record in self.done.items() if url in urls}
+
+    def _resumable(self, header):
+        if header is None or 'started' not in header:
+            return False
+        age = datetime.now(timezone.utc) - datetime.fromisoformat(header['started'])
+        return age <= timedelta(hours=self.max_age_hours) and header.get('run') == self.run
+
+    def _write(self, data):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(data) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def add(self, url, record):
+        with self._lock:
+            self._write({'url': url, **record})
+            self.done[url] = record
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.done = {}
+
+def make_event_fetcher(backend='browser', pool=None, workers=1, snapshots=None, until=None):
+    # Returns fetch(url) -> record for the chosen backend, and the HttpFetcher to close (if any).
+    # With the 'http' backend the pool is only used for pages that need a fallback.
+    # The 'snapshot' backend replays pages saved in `snapshots` (as of `until`) with no network.
+    fetcher = None
+    if backend == 'http':
+        fetcher = HttpFetcher(pool=pool, size=max(workers, 10), snapshots=snapshots)
+        fetch = fetcher.fetch_event_data
+    elif backend == 'browser':
+        fetch = lambda url: fetch_event_data(url, pool, snapshots)
+    elif backend == 'snapshot':
+        latest = snapshots.latest(kind='event', until=until).set_index('url')['sha256']
+        fetch = lambda url: parse_event_page(snapshots.get(latest[url]) if url in latest.index else '')
+    else:
+        raise ValueError(f"Unknown backend: {backend}")
+    return fetch, fetcher
+
+def update_xceed_data(df, pool=None, max_pages=50, workers=1, backend='browser', snapshots=None, until=None, checkpoint=None):  
+    
+    # Reuse the caller's browser pool, or own one recycled session per worker for this run
+    own_pool = pool is None
+    if own_pool:
+        pool = BrowserPool(size=workers, max_pages=max_pages)
+
+    fetch, fetcher = make_event_fetcher(backend, pool, workers, snapshots, until)
+
+    # Records already finished by an interrupted run are taken from the checkpoint
+    if isinstance(checkpoint, str):
+        checkpoint = CrawlCheckpoint(checkpoint, urls=df['url'])
+    if checkpoint is not None:
+        crawl = fetch
+        def fetch(url):
+            record = crawl(url)
+            checkpoint.add(url, record)
+            return record
+
+    # Start time for execution time calculation
+    start_time = time.time()
+    
+    urls = df['url'].tolist()
+    pending = list(dict.fromkeys(url for url in urls if checkpoint is None or url not in checkpoint.done))
+    if len(pending) < len(urls):
+        print(f"Resuming from checkpoint: {len(urls) - len(pending)} events already done")
+
+    try:
+        if workers > 1:
+            # Spread the URLs over worker threads; map keeps the original row order
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(fetch, pending)
+                fetched = dict(zip(pending, tqdm(results, total=len(pending), desc='Processing events', unit='url')))
+        else:
+            fetched = {url: fetch(url) for url in tqdm(pending, desc='Processing events', unit='url')}
+    finally:
+        if fetcher is not None:
+            fetcher.close()
+            print(f"Browser fallback used for {fetcher.fallbacks} of {fetcher.pages} pages")
+        if own_pool:
+            pool.close()
+
+    records = [fetched[url] if url in fetched else checkpoint.done[url] for url in urls]
+    # The crawl is complete: the next run starts from scratch
+    if checkpoint is not None:
+        checkpoint.clear()
 
-    # Entradas que quedan
-    # Utilizamos {} para quitar los valores duplicados.
-        try:
-            remaining_prices_set = {x.text.strip() for x in soup2.find_all('p', class_ = 'PriceText-sc-17wxn8u-2') if "inherit" in str(x)}
-            remaining_ticket_prices = ', '.join(remaining_prices_set)
-        #if "inherit" in str(x): # con 'inherit' nos va a enseñar las entradas que quedan, si lo cambio por 'inherit' nos va a ensañar solo las entradas agotadas si hay
-
-        except:
-            remaining_ticket_prices = np.nan
-
-        event_genres.append(event_genre)
-        line_up.append(event_lineup)
-        venue_information.append(venue_info)
-        event_location_details.append(venue_local_info)
-        event_ticket_types.append(ticket_types)
-        ticket_price.append(ticket_prices)
-        event_name.append(ev_name)
-        location_identifier.append(location_id)
-        location_address.append(location)
-        remain_prices.append(remaining_ticket_prices)
-        
     end_time = time.time()
     execution_time = end_time - start_time
     # estimate time to finish
     time_to_finish = (execution_time * len(urls)) / 60
     print(f"Execution time: {execution_time:.2f} seconds")
 
+    return clean_xceed_data(df, records, data_date=until)
+
+def clean_xceed_data(df, records, data_date=None):
+    # Add the parsed detail-page records to the listing rows and clean them up for Airtable
+    event_name = [r['event_title'] for r in records]
+    event_genres = [r['event_genres'] for r in records]
+    line_up = [r['line_up'] for r in records]
+    venue_information = [r['venue_information'] for r in records]
+    event_location_details = [r['event_location_details'] for r in records]
+    event_ticket_types = [r['event_ticket_types'] for r in records]
+    ticket_price = [r['ticket_price'] for r in records]
+    location_identifier = [r['location_identifier'] for r in records]
+    location_address = [r['location_address'] for r in records]
+    remain_prices = [r['remain_prices'] for r in records]
+    urls = df['url'].tolist()
+
     # Save data to a DataFrame
     data = {
         'event_title': event_name,
@@ -356,61 +1138,255 @@ def update_xceed_data(df):
     df['url'] = urls
     
     # Add starting and finishing time columns
-    df.insert(df.columns.get_loc('date') + 1, 'starting_time', df['date'].apply(lambda x: start_finish_times(x)[0]))
-    df.insert(df.columns.get_loc('starting_time') + 1, 'finishing_time', df['date'].apply(lambda x: start_finish_times(x)[1]))
+    starting_time, finishing_time = parse_xceed_dates(df['date'])
+    df.insert(df.columns.get_loc('date') + 1, 'starting_time', starting_time)
+    df.insert(df.columns.get_loc('starting_time') + 1, 'finishing_time', finishing_time)
     del df['date']
     
     # transform date to string
     df['starting_time'] = df['starting_time'].dt.strftime('%Y-%m-%d %H:%M:%S')
     df['finishing_time'] = df['finishing_time'].dt.strftime('%Y-%m-%d %H:%M:%S')
     
-    df.loc[df['event_ticket_types'] == '', 'event_ticket_types'] = 'No information available'
+    df.loc[df['event_ticket_types'] == '', 'event_ticket_types'] = NO_PRICE_INFO
     # clean ticket price column
-    df.loc[df['event_ticket_types'] == 'No information available', ['ticket_price','remain_prices']] = '1.11'
-    df['ticket_price'] = df['ticket_price'].apply(lambda x: clean_sorted_prices(x))
+    df['ticket_price'] = clean_prices(df['ticket_price'])
     
-    # clean remaining ticket price column
-    df.loc[df['remain_prices'] == '', 'remain_prices'] = '0.11'
-    df['remain_prices'] = df['remain_prices'].apply(lambda x: clean_sorted_prices(x))
+    # clean remaining ticket price column (no price left on sale means sold out)
+    df['remain_prices'] = clean_prices(df['remain_prices'], empty=SOLD_OUT)
+    df.loc[df['event_ticket_types'] == NO_PRICE_INFO, ['ticket_price','remain_prices']] = NO_PRICE_INFO
     
-    # date of creation
-    df['data_date'] = datetime.now().strftime("%Y-%m-%d")
+    # date of creation (the replayed date when rebuilding from snapshots)
+    df['data_date'] = (data_date or datetime.now()).strftime("%Y-%m-%d")
     
     df.replace(np.nan, 'NaN', inplace=True)
     
     return df
         
-    # # Upload data to Airtable
-def upload_to_airtable(df, TOKEN, BASE_ID, TABLE_ID):
-    
-    airtable_base_url = "https://api.airtable.com/v0"
+def replay_xceed_data(snapshots, until=None):
+    # Rebuild the frame update_xceed_data would have produced at `until` from saved
+    # listing and detail pages only: no network, no browser.
+    listings = snapshots.latest(kind='listing', until=until)
+    frames = []
+    for url, digest in zip(listings['url'], listings['sha256']):
+        df_city = parse_listing_page(snapshots.get(digest))
+        df_city['city'] = url.split('/')[4].title()
+        frames.append(df_city)
+    df_urls = pd.concat(frames, ignore_index=True).drop_duplicates('url', ignore_index=True)
+    return update_xceed_data(df_urls, backend='snapshot', snapshots=snapshots, until=until)
 
-    # Headers
-    headers = {"Authorization" : f"Bearer {TOKEN}",
-            "Content-Type"  : "application/json"}
+def record_price_history(df, path='Data/price_history.csv'):
+    # Append this run's prices so later runs can tell how fast each event is changing
+    history = df[['url', 'ticket_price', 'remain_prices']].copy()
+    history.insert(1, 'checked_at', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+    history.to_csv(path, mode='a', header=not os.path.exists(path), index=False)
 
-    # Endpoint
-    endpoint = f"{airtable_base_url}/{BASE_ID}/{TABLE_ID}"
+def load_price_history(path='Data/price_history.csv'):
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=['url', 'checked_at', 'ticket_price', 'remain_prices'])
+    history = pd.read_csv(path)
+    history['checked_at'] = pd.to_datetime(history['checked_at'])
+    return history
 
-    print(endpoint)
-    
-    for i in range(0, df.shape[0], 10):
-        try:
-            
-            batch_data = {"records": [{"fields": df.iloc[j, :].to_dict()} for j in range(i, i + 10)],
-                        "typecast": True}
-        except:
-            
-            batch_data = {"records": [{"fields": df.iloc[j, :].to_dict()} for j in range(i, df.shape[0])],
-                        "typecast": True}
+def _remaining_tiers(prices):
+    # Number of ticket tiers still on sale in a cleaned remain_prices string
+    tiers = prices.fillna('').str.count(',') + 1
+    tiers[prices.isin(['SOLD OUT', 'No information available', '', 'NaN'])] = 0
+    return tiers
 
-        
-        response = requests.post(url=endpoint, json=batch_data, headers=headers)
-        # Log the response for troubleshooting
-        if response.status_code == 200:
-            print(f"Uploaded row {i+1}: {response.json()}")
+def refresh_priority(df_events, history, now=None, weights=(1.0, 1.0, 1.0)):
+    # Score known events by (a) how soon they start, (b) how recently remain_prices
+    # changed and (c) how fast their tiers have been selling out in previous runs.
+    # Events that are sold out or already started are dropped.
+    now = now or datetime.now()
+    df = df_events.copy()
+    starting_time = pd.to_datetime(df['starting_time'])
+    df = df[(starting_time > now) & (df['remain_prices'] != 'SOLD OUT')].copy()
+    hours_to_start = (pd.to_datetime(df['starting_time']) - now).dt.total_seconds() / 3600
+
+    history = history[history['url'].isin(df['url'])].sort_values('checked_at')
+    history = history.assign(checked_at=pd.to_datetime(history['checked_at']),
+                             tiers=_remaining_tiers(history['remain_prices']))
+    by_url = history.groupby('url')
+    changed = history['remain_prices'] != by_url['remain_prices'].shift()
+    last_change = history[changed].groupby('url')['checked_at'].max()
+    observed_days = ((by_url['checked_at'].max() - by_url['checked_at'].min()).dt.total_seconds() / 86400).clip(lower=1)
+    velocity = (by_url['tiers'].first() - by_url['tiers'].last()).clip(lower=0) / observed_days
+
+    days_since_change = (now - pd.to_datetime(df['url'].map(last_change.to_dict()))).dt.total_seconds() / 86400
+    velocity = df['url'].map(velocity.to_dict()).fillna(0)
+
+    w_start, w_change, w_velocity = weights
+    df['priority'] = (w_start / (1 + hours_to_start / 24)
+                      + w_change / (1 + days_since_change.fillna(np.inf))
+                      + w_velocity * velocity / (1 + velocity))
+    return df.sort_values('priority', ascending=False)
+
+def select_refresh_events(df_events, history, top_k=None, time_budget=None, seconds_per_event=2.0, now=None):
+    # Top-K known events to re-scrape this run, capped by what fits in `time_budget` seconds
+    df = refresh_priority(df_events, history, now=now)
+    if time_budget is not None:
+        budget_k = int(time_budget // seconds_per_event)
+        top_k = budget_k if top_k is None else min(top_k, budget_k)
+    return df.head(top_k) if top_k is not None else df
+
+# Airtable REST API (pointed at a local server by the benchmarks) and its batch limit
+AIRTABLE_API_URL = "https://api.airtable.com/v0"
+AIRTABLE_BATCH_SIZE = 10
+
+# Optional HTTP/2 transport for the Airtable client (pip install 'httpx[http2]')
+try:
+    import httpx
+    import h2
+except ImportError:
+    httpx = None
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, np.inf]
+
+class AirtableClient:
+    # One pooled keep-alive connection pool for all Airtable I/O, so batches and pages
+    # reuse TLS connections instead of handshaking per request. Requests go through the
+    # shared rate limiter and retry 429/5xx responses and connection errors with
+    # exponential backoff (or the server's Retry-After). Record-creating POSTs are only
+    # retried after errors raised before the request reached Airtable: after a read
+    # timeout the batch may already be created. Responses are gzip-compressed.
+    # With http2=True and httpx/h2 installed, requests are multiplexed over HTTP/2.
+    # The latency of every attempt is recorded per method for latency_histogram().
+    def __init__(self, pool_size=10, connect_timeout=5.0, read_timeout=30.0, http2=False,
+                 retries=5, backoff=1.0, limiter=None):
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff = backoff
+        self.limiter = limiter
+        self.http2 = http2 and httpx is not None
+        if self.http2:
+            self.session = httpx.Client(http2=True, timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                                        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size))
+            self.errors = (requests.RequestException, httpx.HTTPError)
+            self.connect_errors = (httpx.ConnectError, httpx.ConnectTimeout)
+            self._timeout = {}
         else:
-            print(f"Failed to upload row {i+1}: {response.status_code} - {response.text}")
+            self.session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
+            self.errors = (requests.RequestException,)
+            self.connect_errors = (requests.ConnectTimeout,)
+            self._timeout = {'timeout': (connect_timeout, read_timeout)}
+        self.session.headers.update({'Accept-Encoding': 'gzip', 'Connection': 'keep-alive'})
+        self.latencies = {}
+        self._lock = threading.Lock()
+
+    def request(self, method, url, retries=None, backoff=None, **kwargs):
+        # The last response is returned as is; a connection error on the last attempt is raised
+        retries = self.retries if retries is None else retries
+        backoff = self.backoff if backoff is None else backoff
+        limiter = self.limiter or RATE_LIMITER
+        for attempt in range(retries + 1):
+            delay = backoff * 2 ** attempt
+            # Latency is timed from after the rate limiter lets the request go
+            limiter.wait(url)
+            start = time.monotonic()
+            try:
+                response = self.session.request(method, url, **self._timeout, **kwargs)
+            except self.errors as error:
+                self._record(method, time.monotonic() - start)
+                if attempt == retries or (method.upper() == 'POST' and not self._unsent(error)):
+                    raise
+            else:
+                elapsed = time.monotonic() - start
+                self._record(method, elapsed)
+                limiter.record(url, response.status_code, elapsed)
+                if (response.status_code != 429 and response.status_code < 500) or attempt == retries:
+                    return response
+                delay = float(response.headers.get('Retry-After', delay))
+            sleep(delay)
+
+    def _unsent(self, error):
+        # Whether the request failed before it was sent (the connection could not be opened)
+        reason = getattr(error.args[0], 'reason', None) if error.args else None
+        return isinstance(error, self.connect_errors) or isinstance(reason, NewConnectionError)
+
+    def _record(self, method, elapsed):
+        with self._lock:
+            self.latencies.setdefault(method, []).append(elapsed)
+
+    def latency_histogram(self, buckets=LATENCY_BUCKETS):
+        # Number of requests per latency bucket (rows, "<= seconds") and method (columns)
+        with self._lock:
+            latencies = {method: list(values) for method, values in self.latencies.items()}
+        edges = [0.0] + list(buckets)
+        return pd.DataFrame({method: np.histogram(values, bins=edges)[0] for method, values in latencies.items()},
+                            index=pd.Index([f'<= {bound:g}s' for bound in buckets], name='latency'))
+
+    def latency_stats(self):
+        with self._lock:
+            latencies = {method: np.array(values) for method, values in self.latencies.items()}
+        return pd.DataFrame({'method': list(latencies),
+                             'requests': [len(values) for values in latencies.values()],
+                             'mean_s': [round(values.mean(), 3) for values in latencies.values()],
+                             'p50_s': [round(np.percentile(values, 50), 3) for values in latencies.values()],
+                             'p90_s': [round(np.percentile(values, 90), 3) for values in latencies.values()],
+                             'p99_s': [round(np.percentile(values, 99), 3) for values in latencies.values()]})
+
+    def reset_stats(self):
+        with self._lock:
+            self.latencies = {}
+
+    def close(self):
+        self.session.close()
+
+# Shared by every Airtable call in the project
+AIRTABLE_CLIENT = AirtableClient()
+
+def send_airtable_batches(method, endpoint, headers, records, workers=5, retries=5, backoff=1.0, options=None,
+                          client=None):
+    # Send `records` (Airtable {"fields": ...} / {"id": ..., "fields": ...} dicts) in
+    # 10-record batches, concurrently over the shared Airtable client; `options` are
+    # extra request body keys (e.g. performUpsert). Returns per-record lists ok,
+    # record_id, status_code, error and created (the record was created by an upsert)
+    batches = [range(i, min(i + AIRTABLE_BATCH_SIZE, len(records))) for i in range(0, len(records), AIRTABLE_BATCH_SIZE)]
+    ok, record_ids, status_codes, errors = [False] * len(records), [None] * len(records), [None] * len(records), [None] * len(records)
+    created = [False] * len(records)
+    client = client or AIRTABLE_CLIENT
+
+    def send(rows):
+        batch_data = {"records": [records[j] for j in rows], "typecast": True, **(options or {})}
+        try:
+            return rows, client.request(method, endpoint, retries=retries, backoff=backoff,
+                                        json=batch_data, headers=headers), None
+        except client.errors as e:
+            return rows, None, str(e)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for rows, response, error in executor.map(send, batches):
+            if response is not None and response.status_code == 200:
+                data = response.json()
+                new_ids = set(data.get('createdRecords', []))
+                for j, record in zip(rows, data['records']):
+                    ok[j], record_ids[j], created[j] = True, record['id'], record['id'] in new_ids
+            for j in rows:
+                status_codes[j] = response.status_code if response is not None else None
+                if not ok[j]:
+                    errors[j] = error if response is None else response.text[:200]
+    return ok, record_ids, status_codes, errors, created
+
+def upload_to_airtable(df, TOKEN, BASE_ID, TABLE_ID, workers=5, retries=5, backoff=1.0):
+    # Create one Airtable record per row. Returns a report aligned with df: ok,
+    # record_id, status_code and error for every row, so failed rows can be retried
+    headers = {"Authorization" : f"Bearer {TOKEN}",
+            "Content-Type"  : "application/json"}
+    endpoint = f"{AIRTABLE_API_URL}/{BASE_ID}/{TABLE_ID}"
+
+    records = [{"fields": fields} for fields in df.to_dict('records')]
+    ok, record_ids, status_codes, errors, _ = send_airtable_batches('POST', endpoint, headers, records,
+                                                                    workers, retries, backoff)
+
+    report = pd.DataFrame({'ok': ok, 'record_id': record_ids, 'status_code': status_codes, 'error': errors},
+                          index=df.index)
+    print(f"Uploaded {sum(ok)} of {len(records)} records to {endpoint}"
+          + (f" ({len(records) - sum(ok)} failed)" if not all(ok) else ""))
+    return report
             
 def airtable_columns_order(df):
     df = df[['event_title', 'event_genres', 'line_up', 'place', 'starting_time', 'finishing_time',
@@ -418,19 +1394,102 @@ def airtable_columns_order(df):
                  'location_identifier', 'location_address', 'remain_prices', 'image', 'url', 'data_date']]
     return df
 
-# Loop through the DataFrame rows and update each record
-def update_airtable_events(df, TOKEN, BASE_ID, TABLE_ID):
-    at = airtable.Airtable(BASE_ID, TABLE_ID, TOKEN)
-    for index, row in df.iterrows():
-        record_id = row['id']
-        remain_price = row['remain_prices']
-        data_date = row['data_date']
-        
-        # Prepare the data dictionary for each record
-        data = {'remain_prices': remain_price, 'data_date': data_date}
-        
-        at.update(record_id, data)
+def _batch_report(df, sent, ok, record_ids, status_codes, errors):
+    # Per-row report for df where only the rows in the `sent` mask were sent; the
+    # others count as ok and keep their existing record id
+    columns = {'ok': np.ones(len(df), dtype=bool),
+               'record_id': df['id'].to_numpy(dtype=object, copy=True) if 'id' in df else np.full(len(df), None, dtype=object),
+               'status_code': np.full(len(df), None, dtype=object),
+               'error': np.full(len(df), None, dtype=object)}
+    for column, values in zip(columns, [ok, record_ids, status_codes, errors]):
+        columns[column][sent] = values
+    return pd.DataFrame(columns, index=df.index)
+
+# Fields an update run keeps in sync on records that already exist in Airtable
+UPDATE_FIELDS = ['remain_prices']
+
+def airtable_changes(df, current, fields=UPDATE_FIELDS, key='id'):
+    # Which of `fields` differ between the rows of df and the Airtable snapshot
+    # `current` (matched on `key`); rows missing from the snapshot count as changed
+    snapshot = current.drop_duplicates(key).set_index(key).reindex(index=df[key], columns=fields)
+    new = df[fields].fillna('NaN').astype(str).to_numpy()
+    old = snapshot.fillna('NaN').astype(str).to_numpy()
+    changed = (new != old) | ~df[key].isin(current[key]).to_numpy()[:, None]
+    return pd.DataFrame(changed, index=df.index, columns=fields)
+
+def update_airtable_events(df, TOKEN, BASE_ID, TABLE_ID, current=None, fields=UPDATE_FIELDS,
+                           workers=5, retries=5, backoff=1.0):
+    # PATCH only the records and fields that changed since the Airtable snapshot
+    # `current` (every row when no snapshot is given), plus data_date, in 10-record
+    # batches sent concurrently. Returns a report aligned with df: ok, record_id,
+    # status_code, error and updated (False for rows that needed no request)
+    headers = {"Authorization" : f"Bearer {TOKEN}",
+            "Content-Type"  : "application/json"}
+    endpoint = f"{AIRTABLE_API_URL}/{BASE_ID}/{TABLE_ID}"
+
+    if current is None:
+        changed = pd.DataFrame(True, index=df.index, columns=fields)
+    else:
+        changed = airtable_changes(df, current, fields)
+    updated = changed.any(axis=1).to_numpy()
+
+    records = []
+    for row, flags in zip(df[updated].to_dict('records'), changed[updated].to_dict('records')):
+        data = {field: row[field] for field in fields if flags[field]}
+        data['data_date'] = row['data_date']
+        records.append({"id": row['id'], "fields": data})
+    sent = send_airtable_batches('PATCH', endpoint, headers, records, workers, retries, backoff)
+
+    report = _batch_report(df, updated, *sent[:4])
+    report['updated'] = updated
+    print(f"Updated {sum(sent[0])} of {len(df)} records ({len(df) - updated.sum()} unchanged"
+          + (f", {len(records) - sum(sent[0])} failed)" if not all(sent[0]) else ")"))
+    return report
         
+def upsert_airtable_events(df, TOKEN, BASE_ID, TABLE_ID, current=None, fields=UPDATE_FIELDS,
+                           workers=5, retries=5, backoff=1.0):
+    # Create-or-update keyed on url with Airtable's performUpsert, so new and known
+    # events share one batched, concurrent, rate-limited channel and an event can't be
+    # created twice. Events missing from the snapshot `current` (every row when no
+    # snapshot is given) are sent with all their fields, known ones with only the
+    # changed `fields` plus data_date, and unchanged ones not at all. Returns a report
+    # aligned with df: ok, record_id, status_code, error and action ('create',
+    # 'update', 'unchanged' or 'failed')
+    headers = {"Authorization" : f"Bearer {TOKEN}",
+            "Content-Type"  : "application/json"}
+    endpoint = f"{AIRTABLE_API_URL}/{BASE_ID}/{TABLE_ID}"
+
+    if current is None:
+        known = np.zeros(len(df), dtype=bool)
+        changed = pd.DataFrame(True, index=df.index, columns=fields)
+    else:
+        known = df['url'].isin(current['url']).to_numpy()
+        changed = airtable_changes(df, current, fields, key='url')
+    send = ~known | changed.any(axis=1).to_numpy()
+
+    records = []
+    for row, is_known, flags in zip(df.to_dict('records'), known, changed.to_dict('records')):
+        if not is_known:
+            records.append({"fields": {k: v for k, v in row.items() if k != 'id'}})
+        elif any(flags.values()):
+            data = {'url': row['url'], **{field: row[field] for field in fields if flags[field]}}
+            data['data_date'] = row['data_date']
+            records.append({"fields": data})
+    ok, record_ids, status_codes, errors, created = send_airtable_batches(
+        'PATCH', endpoint, headers, records, workers, retries, backoff,
+        options={"performUpsert": {"fieldsToMergeOn": ["url"]}})
+
+    if 'id' not in df and current is not None and 'id' in current:
+        df = df.assign(id=df['url'].map(current.drop_duplicates('url').set_index('url')['id']))
+    report = _batch_report(df, send, ok, record_ids, status_codes, errors)
+    action = np.full(len(df), 'unchanged', dtype=object)
+    action[send] = np.where(ok, np.where(created, 'create', 'update'), 'failed') if records else []
+    report['action'] = action
+    counts = report['action'].value_counts()
+    print(f"Upserted {len(records)} of {len(df)} records: " +
+          ', '.join(f"{counts.get(action, 0)} {action}" for action in ['create', 'update', 'unchanged', 'failed']))
+    return report
+
 def load_airtable_data():
     # Load environment variables
     load_dotenv()
@@ -440,11 +1499,163 @@ def load_airtable_data():
     TABLE_ID = os.getenv('TABLE_ID')
 
     # Define Airtable API details
-    airtable_base_url = "https://api.airtable.com/v0"
     headers = {"Authorization": f"Bearer {TOKEN}"}
-    endpoint = f"{airtable_base_url}/{BASE_ID}/{TABLE_ID}"
+    endpoint = f"{AIRTABLE_API_URL}/{BASE_ID}/{TABLE_ID}"
     view_name = "Grid view"
 
     # Fetch and process data
     records = fetch_airtable_data(view_name=view_name, endpoint=endpoint, headers=headers)
-    return airtable_to_dataframe(records)
\ No newline at end of file
+    return airtable_to_dataframe(records)
+
+# End-of-stream marker passed between pipeline stages
+_STREAM_DONE = object()
+
+def _put(out_queue, item, stop):
+    # Blocking put that gives up once the pipeline is stopped
+    while not stop.is_set():
+        try:
+            out_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def _pump(items, out_queue, errors, stop):
+    try:
+        for item in items:
+            if not _put(out_queue, item, stop):
+                break
+    except Exception as e:
+        errors.append(e)
+    finally:
+        # Runs the stage's own cleanup (e.g. closing the browser pool) even when stopped early
+        if hasattr(items, 'close'):
+            items.close()
+        _put(out_queue, _STREAM_DONE, stop)
+
+def _drain(in_queue, stop):
+    while not stop.is_set():
+        try:
+            item = in_queue.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if item is _STREAM_DONE:
+            return
+        yield item
+
+def run_pipeline(source, *stages, buffer_size=50):
+    # Chain generator stages, each fed by its own thread through a bounded queue, so the
+    # stages overlap and a slow stage applies backpressure to the ones before it. If the
+    # consumer stops early or raises, every stage is stopped and closed before returning
+    errors = []
+    stop = threading.Event()
+    threads = []
+    stream = source
+    for stage in stages:
+        buffer = queue.Queue(maxsize=buffer_size)
+        thread = threading.Thread(target=_pump, args=(stream, buffer, errors, stop), daemon=True)
+        thread.start()
+        threads.append(thread)
+        stream = stage(_drain(buffer, stop))
+    try:
+        yield from stream
+    finally:
+        stop.set()
+        if hasattr(stream, 'close'):
+            stream.close()
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+
+def iter_xceed_data(df, pool=None, max_pages=50, workers=1, backend='browser', snapshots=None):
+    # Yields (listing row, parsed record) pairs as detail pages finish, in row order,
+    # with at most 2 * workers pages in flight
+    own_pool = pool is None
+    if own_pool:
+        pool = BrowserPool(size=workers, max_pages=max_pages)
+    fetch, fetcher = make_event_fetcher(backend, pool, workers, snapshots)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            in_flight = deque()
+            for row in df.to_dict('records'):
+                in_flight.append((row, executor.submit(fetch, row['url'])))
+                if len(in_flight) >= 2 * workers:
+                    row, future = in_flight.popleft()
+                    yield row, future.result()
+            while in_flight:
+                row, future = in_flight.popleft()
+                yield row, future.result()
+    finally:
+        if fetcher is not None:
+            fetcher.close()
+        if own_pool:
+            pool.close()
+
+def clean_stage(pairs, batch_size=10):
+    # Micro-batches of cleaned rows, ready for Airtable
+    batch = []
+    for pair in pairs:
+        batch.append(pair)
+        if len(batch) == batch_size:
+            yield clean_xceed_data(pd.DataFrame([row for row, _ in batch]), [record for _, record in batch])
+            batch = []
+    if batch:
+        yield clean_xceed_data(pd.DataFrame([row for row, _ in batch]), [record for _, record in batch])
+
+def _write_batches(frames, size):
+    # Cleaned micro-batches concatenated into frames of at least `size` rows
+    pending, rows = [], 0
+    for df in frames:
+        pending.append(df)
+        rows += len(df)
+        if rows >= size:
+            yield pd.concat(pending, ignore_index=True)
+            pending, rows = [], 0
+    if pending:
+        yield pd.concat(pending, ignore_index=True)
+
+def stream_xceed_to_airtable(df_urls, store, TOKEN, BASE_ID, TABLE_ID, workers=1, backend='browser',
+                             snapshots=None, checkpoint=None, batch_size=10, buffer_size=50, current=None,
+                             write_size=50):
+    # Scrape -> clean -> batched Airtable upserts, with all stages running concurrently.
+    # Cleaned rows are upserted `write_size` at a time, so each call fills several
+    # 10-record requests that go out concurrently within the rate limit. Returns every
+    # cleaned row with its Airtable id and the action taken for it ('create', 'update',
+    # 'unchanged' when it matches the snapshot `current`, or 'failed').
+    # With an EventStore the snapshot defaults to the mirror and written rows are saved
+    # to it. Rows are checkpointed once written, so a rerun after a crash skips them.
+    if store is not None and current is None:
+        current = store.to_dataframe(['url'] + UPDATE_FIELDS)
+    if isinstance(checkpoint, str):
+        checkpoint = CrawlCheckpoint(checkpoint, urls=df_urls['url'])
+    if checkpoint is not None and checkpoint.done:
+        print(f"Resuming from checkpoint: {len(checkpoint.done)} events already written")
+        df_urls = df_urls[~df_urls['url'].isin(checkpoint.done)]
+
+    written = []
+    stages = run_pipeline(iter_xceed_data(df_urls, workers=workers, backend=backend, snapshots=snapshots),
+                          lambda pairs: clean_stage(pairs, batch_size),
+                          buffer_size=buffer_size)
+    for df in _write_batches(stages, write_size):
+        df = airtable_columns_order(df)
+        report = upsert_airtable_events(df, TOKEN, BASE_ID, TABLE_ID, current=current)
+        df = df.assign(id=report['record_id'], action=report['action'])
+        if store is not None:
+            store.save_rows(df[df['action'] == 'create'])
+            store.save_rows(df[df['action'] == 'update'], fields=UPDATE_FIELDS + ['data_date'])
+        written.append(df)
+        if checkpoint is not None:
+            # Failed rows stay out of the checkpoint so the next run retries them
+            for row in df[df['action'] != 'failed'].to_dict('records'):
+                checkpoint.add(row['url'], row)
+
+    if checkpoint is not None:
+        rows = [{'url': url, **row} for url, row in checkpoint.done.items()]
+        failed = [df[df['action'] == 'failed'] for df in written]
+        written = ([pd.DataFrame(rows)] if rows else []) + [df for df in failed if len(df)]
+        checkpoint.clear()
+    if not written:
+        return pd.DataFrame(columns=['url', 'action'])
+    return pd.concat(written, ignore_index=True)
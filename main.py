@@ -16,10 +16,12 @@ st.set_page_config(
 )
 @st.cache_data
 def load_data():
-    return pd.read_csv('Data/airtable_preprocessed_data.csv')
+    df = pd.read_csv('Data/airtable_preprocessed_data.csv')
+    # Genre columns are built once here so the genre filter never rescans the strings
+    return df, GenreIndex(df['event_genres'])
 
 # Load the data
-df = load_data()
+df, genre_index = load_data()
 
 df['starting_time'] = pd.to_datetime(df['starting_time'])
 
@@ -117,9 +119,12 @@ if choice == "Analysis and Conclusions":
         max_value=df["finishing_time"].dt.date.max(),
         value=df["finishing_time"].dt.date.max())  # Default to 7 days after the start date
 
-    # Filter the data based on the selected date range
-    df = df[(df['starting_time'] >= choose_starting_date.strftime('%Y-%m-%d')) 
-                    & (df['finishing_time'] <= choose_finishing_date.strftime('%Y-%m-%d'))]
+    choose_genres = st.sidebar.multiselect("**Genres:**", genre_index.genres)
+
+    # Filter the data based on the selected date range and genres
+    date_mask = ((df['starting_time'] >= choose_starting_date.strftime('%Y-%m-%d')) 
+                    & (df['finishing_time'] <= choose_finishing_date.strftime('%Y-%m-%d')))
+    df = df[date_mask.to_numpy() & genre_index.mask(choose_genres)]
 
     choose_price_filter = st.sidebar.selectbox("**Price filter:**", ["All", "Free", "Sold Out"], index=0)
     
@@ -569,7 +574,7 @@ if choice == "Analysis and Conclusions":
             """
         )
         
-        df_sold_out = df[df['remain_prices'] == 'SOLD OUT']
+        df_sold_out = df[df['remain_prices_sold_out']]
         choice = st.sidebar.selectbox("Choose a visualization", ["Percentage of Events by City", 
                                                                  "Top 10 Genres by City", 
                                                                  "Genres by City (Sunburst)", 
@@ -582,7 +587,7 @@ if choice == "Analysis and Conclusions":
         if choice == "Percentage of Events by City":
             st.subheader("Percentage of Sold Out Events by City")
             
-            sold_out_events = df[df['remain_prices'] == 'SOLD OUT'].shape[0]
+            sold_out_events = df[df['remain_prices_sold_out']].shape[0]
             all_events = df.shape[0]
             sold_out_percentage = round((sold_out_events / all_events) * 100, 2)
             labels = ['Sold Out Events', 'Available Events']
@@ -14,7 +14,6 @@ from datetime import datetime, timedelta  # For working with date and time
 from tqdm import tqdm  # For displaying progress bars
 from functions import *  # Import custom functions from another file
 from dotenv import load_dotenv  # For loading environment variables from a .env file
-import airtable  # For interacting with Airtable API
 from geopy.geocoders import Nominatim
 
 # Load environment variables from the .env file
@@ -25,9 +24,6 @@ TOKEN = os.getenv('XCEED_TOKEN')  # API token for Airtable
 BASE_ID = os.getenv('BASE_ID')  # Base ID for Airtable
 TABLE_ID = os.getenv('TABLE_ID')  # Table ID for Airtable
 
-# Set Airtable base URL for API access
-airtable_base_url = "https://api.airtable.com/v0"
-
 # Define the headers for API requests to Airtable
 headers = {
     "Authorization": f"Bearer {TOKEN}",
@@ -35,14 +31,22 @@ headers = {
 }
 
 # Set the endpoint for Airtable API with the specific base and table ID
-endpoint = f"{airtable_base_url}/{BASE_ID}/{TABLE_ID}"
+endpoint = f"{AIRTABLE_API_URL}/{BASE_ID}/{TABLE_ID}"
 view_name = "Grid view"  # The view name in Airtable to fetch data from
 
-# Fetch existing event data from Airtable using a custom function `fetch_airtable_data`
-records = fetch_airtable_data(view_name=view_name, endpoint=endpoint, headers=headers)
+# Local mirror of the Airtable table: only records changed in Airtable since the previous
+# run are downloaded, everything else (new/known split, record ids, the final read of
+# the table) is answered from the mirror. Changed records the mirror already holds only
+# bring the fields this run compares; the large texts (venue_information,
+# event_location_details) are downloaded for events the mirror has not seen yet.
+# Once a week the whole table is downloaded again, so records deleted in Airtable and
+# edits to the other fields reach the mirror (and the CSV written below)
+store = EventStore('Data/events.db')
+store.sync_from_airtable(endpoint, headers, view_name=view_name, fields=['url', 'starting_time', 'remain_prices'],
+                         full_every_days=7)
 
-# Convert the fetched data into a pandas DataFrame
-df_airtable_events = airtable_to_dataframe(records)
+# The fields the refresh scheduler needs for the events already in Airtable
+df_airtable_events = store.to_dataframe(['url', 'starting_time', 'remain_prices'])
 
 # Define the list of cities to scrape event data from
 ciudades = ['Valencia', 'Barcelona', 'Madrid']
@@ -50,54 +54,46 @@ ciudades = ['Valencia', 'Barcelona', 'Madrid']
 # Define the finish date for event scraping (current date + 10 days)
 finish_date = datetime.now() + timedelta(days=15)
 
-# Update event URLs using a custom scraping function `scraping_xceed_urls`
-df_urls = scraping_xceed_urls(ciudades, finish_date)
-
-# Update event data by passing the URLs to another custom function `update_xceed_data`
-df_updated = update_xceed_data(df_urls)
-
-# Filter the updated event data to get only the events that already exist in Airtable
-df_updated_airtable = df_updated[df_updated['url'].isin(df_airtable_events['url']) == True]
-
-# Reorder the columns of the updated events to match Airtable's column structure
-df_updated_airtable = airtable_columns_order(df_updated_airtable)
+# Keep a compressed copy of every fetched page so extraction can be re-run offline
+snapshots = SnapshotStore('Data/snapshots')
 
-# Merge the updated event data with the existing data from Airtable to preserve Airtable IDs
-df_updated_airtable = df_updated_airtable.merge(df_airtable_events[['url', 'id']], on='url', how='left')
-
-# Try to update the events in Airtable
-try:
-    update_airtable_events(df_updated_airtable, TOKEN, BASE_ID, TABLE_ID)
-    print('Events updated in Airtable')
-except Exception as e:
-    print('Error updating events in Airtable')
-    print(e)
-
-# Identify new events by checking which URLs are not already in Airtable
-df_new_events = df_updated[df_updated['url'].isin(df_airtable_events['url']) == False]
-
-# If no new events are found, print a message
-if df_new_events.empty:
-    print('No new events to add')
-else:
-    # Reorder columns of the new events to match Airtable's column structure
-    df_new_events = airtable_columns_order(df_new_events)
-    
-    # Replace NaN values with 'NaN' to handle missing data
-    df_new_events.replace({np.nan: 'NaN'}, inplace=True)
-    
-    # Try to add the new events to Airtable
-    try:
-        upload_to_airtable(df_new_events, TOKEN, BASE_ID, TABLE_ID)
-        print('New events added to Airtable')
-    except Exception as e:
-        print('Error adding new events to Airtable')
-        print(e)
+# Update event URLs using a custom scraping function `scraping_xceed_urls`
+df_urls = scraping_xceed_urls(ciudades, finish_date, snapshots=snapshots)
+
+# New events are always scraped; known events are only re-scraped when the refresh
+# scheduler ranks them in the top of this run's time budget (sold-out and past
+# events drop out entirely)
+price_history = load_price_history()
+known = store.lookup(df_urls['url']).notna()
+df_known = df_airtable_events[df_airtable_events['url'].isin(df_urls.loc[known, 'url'])]
+df_refresh = select_refresh_events(df_known, price_history, time_budget=30 * 60)
+df_urls = df_urls[~known | df_urls['url'].isin(df_refresh['url'])].reset_index(drop=True)
+print(f"Refreshing {len(df_refresh)} of {len(df_known)} known events")
+
+# Stream the scraped events straight into Airtable: detail pages are crawled in parallel
+# over HTTP (Chrome only as a fallback), cleaned in small batches and upserted on url
+# (new and known events in the same batches) while the crawl is still running.
+# Written rows are checkpointed so a rerun after a crash picks up where it stopped.
+# Known records are only sent when their prices moved, and every write is saved to
+# the mirror as well.
+df_updated = stream_xceed_to_airtable(df_urls, store, TOKEN, BASE_ID, TABLE_ID, workers=4,
+                                      backend="http", snapshots=snapshots,
+                                      checkpoint='Data/checkpoint.jsonl')
+
+df_updated_airtable = df_updated[df_updated['action'] == 'update']
+df_new_events = df_updated[df_updated['action'] == 'create']
+
+# Remember this run's prices for the next run's refresh priorities
+record_price_history(df_updated)
 
 # Print the number of events that were updated and the number of new events added
 print(f"{len(df_updated_airtable)} events have been updated")
+print(f"{(df_updated['action'] == 'unchanged').sum()} events were unchanged")
 print(f"{len(df_new_events)} new events have been added")
 
+# Latency of this run's Airtable requests (all sent over the shared pooled client)
+print(AIRTABLE_CLIENT.latency_stats())
+
 # Prepare a report showing the number of events updated and added, along with the current date
 report = pd.DataFrame({
     'date': [datetime.now().strftime('%Y-%m-%d %H:%M:%S')],
@@ -111,19 +107,28 @@ if os.path.exists('data/report.csv'):
 else:
     report.to_csv('data/report.csv', mode='w', header=True, index=False)
     
-df = load_airtable_data()
+df = store.to_dataframe()
 # save the data to a csv file
 
 # Preprocessing
 
 geolocator = Nominatim(user_agent="geoapi")
 def get_district(lat, lon):
+    # Nominatim allows 1 request/sec; the shared limiter paces and backs off for us.
+    # None on failure, so the venue is retried on the next run instead of cached
+    RATE_LIMITER.wait('nominatim.openstreetmap.org')
+    start = time.monotonic()
     try:
         location = geolocator.reverse((lat, lon), exactly_one=True, language='en')
-        address = location.raw.get('address', {})
+        RATE_LIMITER.record('nominatim.openstreetmap.org', 200, time.monotonic() - start)
+        address = location.raw.get('address', {}) if location else {}
         return address.get('suburb', address.get('city', 'Unknown'))  # Try 'suburb', fallback to 'city'
     except Exception as e:
-        return 'Unknown'
+        RATE_LIMITER.record('nominatim.openstreetmap.org', 429, time.monotonic() - start)
+        return None
+
+# Districts of venues geocoded on earlier runs; only new venues are sent to Nominatim
+geocode_cache = GeocodeCache('Data/geocode.db')
        
 def preprocess_data(df):
     df['city'] = [city.split(',')[-2].strip() for city in df['location_address']]
@@ -131,15 +136,21 @@ def preprocess_data(df):
     df['starting_time'] = pd.to_datetime(df['starting_time'])
     df['starting_day'] = df['starting_time'].dt.day_name()
     df['finishing_time'] = pd.to_datetime(df['finishing_time'])
-    df['free_entrance'] = df['remain_prices'].str.contains(r'\b0\.0\b', na=False)
+    # Typed price columns, parsed once here instead of re-splitting the strings in every chart
+    df = df.join(price_columns(df['ticket_price'], 'ticket_price'))
+    df = df.join(price_columns(df['remain_prices'], 'remain_prices'))
+    df['free_entrance'] = df['remain_prices_min'] == 0
     df['latitud'] = df['location_identifier'].apply(lambda x: x.split(',')[0])
     df['longitud'] = df['location_identifier'].apply(lambda x: x.split(',')[1])
-    df['district'] = df.apply(lambda x: get_district(x['latitud'], x['longitud']), axis=1)
+    df['district'] = reverse_geocode(df['location_identifier'], get_district, geocode_cache)
 
     return df
 
 df = preprocess_data(df)
 df.to_csv('Data/airtable_preprocessed_data.csv', index=False)
+
+# Achieved request rates per host, to tune the limits in HOST_RATE_LIMITS
+print(RATE_LIMITER.stats())
     
 # Description: This script updates event data in Airtable by fetching new event URLs from Xceed and updating the event details. 
 # It also adds new events to Airtable if any are found. Finally, it generates a report with the number of events updated and added, along with the current date and time.            
\ No newline at end of file
@@ -11,7 +11,7 @@ import random
 from time import sleep
 from datetime import datetime, timedelta
 from tqdm import tqdm
-from functions import start_finish_times, clean_sorted_prices
+from functions import start_finish_times, clean_prices, parse_event_page, BrowserPool
 from dotenv import load_dotenv
 
 # Load environment variables from a .env file (for sensitive data like API keys)
@@ -127,95 +127,25 @@ for ciudad in ciudades:
     # Start measuring time to estimate how long the process will take
     start_time = time.time()
 
-    # Loop through each collected event URL to gather detailed information
-    for url in tqdm(urls, desc='Processing events', unit='url'):
-        # Reopen the browser for each event URL (as we are scraping individual event pages)
-        browser = webdriver.Chrome(options=chrome_options)
-        browser.get(url)
-        
-        # Parse the event page content with BeautifulSoup
-        soup2 = BeautifulSoup(browser.page_source, "html.parser")
-
-        # Extract event name
-        try:
-            ev_name = soup2.find('h1').text  # Get the event name (title)
-        except:
-            ev_name = np.nan  # Handle missing event name
-
-        # Extract event genres (music genres, etc.)
-        try:
-            event_genre = ', '.join([x.text for x in soup2.find_all('span', attrs={'name': True})])  # Collect all genre information
-        except:
-            event_genre = np.nan  # Handle missing genre info
-        
-        # Extract event lineup (performers or speakers)
-        try:
-            event_lineup = ', '.join([x.text for x in soup2.find('div', class_='LineUp-sc-1xigslr-0').find_all('h3')])  # Collect lineup details
-        except:
-            event_lineup = np.nan  # Handle missing lineup info
-        
-        # Extract venue information (like address, venue capacity)
-        try:
-            v_info = soup2.find_all('div', attrs={'overflow': 'hidden'})[0].text  # Extract first div for venue info
-            venue_info = re.sub(r'\s+', ' ', v_info).strip()  # Clean up the venue information
-        except:
-            venue_info = np.nan  # Handle missing venue info
-
-        # Extract local venue information (e.g., city or area)
-        try:
-            v_local_info = soup2.find_all('div', attrs={'overflow': 'hidden'})[1].text  # Extract second div for local venue info
-            venue_local_info = re.sub(r'\s+', ' ', v_local_info).strip()  # Clean up local venue info
-        except:
-            venue_local_info = np.nan  # Handle missing local venue info
-
-        # Extract ticket types (general admission, VIP, etc.)
-        try:
-            unique_ticket_types = {x.text for x in soup2.find_all('h3', class_='Name-sc-17wxn8u-0')}  # Collect unique ticket types
-            ticket_types = ', '.join(unique_ticket_types)  # Join ticket types into a single string
-        except:
-            ticket_types = np.nan  # Handle missing ticket types
-
-        # Extract ticket prices
-        try:
-            unique_ticket_prices = {x.text.strip() for x in soup2.find_all('p', class_='PriceText-sc-17wxn8u-2')}  # Collect unique ticket prices
-            ticket_prices = ', '.join(unique_ticket_prices)  # Join prices into a single string
-        except:
-            ticket_prices = np.nan  # Handle missing prices
-
-        # Extract location identifier (ID for the venue)
-        try:
-            location_id = soup2.find('a', class_='TertiaryTitle-sc-hrr11b-4')['href'].split('=')[-1]  # Extract location ID from the URL
-        except:
-            location_id = np.nan  # Handle missing location ID
-
-        # Extract the event location (address or city)
-        try:
-            location = soup2.find('p', attrs={'color': '#6E7A83'}).text  # Extract location address
-        except:
-            location = np.nan  # Handle missing location address
-
-        # Extract remaining ticket prices (for tickets still available)
-        try:
-            remaining_prices_set = {x.text.strip() for x in soup2.find_all('p', class_='PriceText-sc-17wxn8u-2') if "inherit" in str(x)}  # Filter for remaining ticket prices
-            remaining_ticket_prices = ', '.join(remaining_prices_set)  # Join remaining ticket prices into a single string
-        except:
-            remaining_ticket_prices = np.nan  # Handle missing remaining ticket prices
-
-        # Append the collected data to the corresponding lists
-        event_genres.append(event_genre)
-        line_up.append(event_lineup)
-        venue_information.append(venue_info)
-        event_location_details.append(venue_local_info)
-        event_ticket_types.append(ticket_types)
-        ticket_price.append(ticket_prices)
-        event_name.append(ev_name)
-        location_identifier.append(location_id)
-        location_address.append(location)
-        sold_out_prices.append(ticket_prices)
-        remain_prices.append(remaining_ticket_prices)
-
-        # Close the browser after processing the event page
-        browser.quit()
+    # Loop through each collected event URL to gather detailed information,
+    # reusing a small pool of browser sessions instead of one Chrome per page
+    with BrowserPool(size=1, options=chrome_options) as pool:
+        for url in tqdm(urls, desc='Processing events', unit='url'):
+            # Load the event page and extract its fields
+            record = parse_event_page(pool.page_source(url))
+
+            # Append the collected data to the corresponding lists
+            event_genres.append(record['event_genres'])
+            line_up.append(record['line_up'])
+            venue_information.append(record['venue_information'])
+            event_location_details.append(record['event_location_details'])
+            event_ticket_types.append(record['event_ticket_types'])
+            ticket_price.append(record['ticket_price'])
+            event_name.append(record['event_title'])
+            location_identifier.append(record['location_identifier'])
+            location_address.append(record['location_address'])
+            sold_out_prices.append(record['ticket_price'])
+            remain_prices.append(record['remain_prices'])
 
     # Create a DataFrame from the collected data
     df = pd.DataFrame({
@@ -233,7 +163,7 @@ for ciudad in ciudades:
     })
 
     # Clean and format ticket prices using a custom function
-    df['ticket_prices'] = df['ticket_prices'].apply(clean_sorted_prices)
+    df['ticket_prices'] = clean_prices(df['ticket_prices'])
     
     # Save the DataFrame to an Excel file for future analysis
     df.to_excel(f"events_{ciudad}.xlsx", index=False)